@@ -0,0 +1,211 @@
+"""
+	Timings of the stages of the simulation hot path, each on its own:
+		* odds_iteration: agency.get_betting_oddset()
+		* strategy_bet: strategy.bet() on every odds
+		* settlement: agency.evaluate() of the bets of every match
+		* stats_update: StrategyStatistics.update() for every match
+		* stats_to_df: Simulation.stats_to_df() of the filled statistics
+		* simulate / simulate_vectorized: a whole Simulation.simulate()
+	reported as matches/sec and peak traced memory, on fixed datasets:
+		* synthetic: seeded SyntheticMatches
+		* sampled: a seeded sample of the rows of a real csv (with --csv)
+
+	Results are saved as JSON, --compare prints the speedup against an earlier result file.
+
+	python benchmarks/bench_hot_path.py [--matches N] [--csv matches.csv] [--out bench.json]
+		[--compare old_bench.json]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import tracemalloc
+import numpy as np
+
+from copy import deepcopy
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from betting_agency import Bet365, StoreAgency
+from simulation import Simulation
+from synthetic import SyntheticMatches
+from strategy.config import BetStrategyConfigAbsolut
+from strategy.stateless import BetOnClearFavorite, BetOnRealChanceIfOddsFake
+from strategy.stats import StrategyStatistics
+
+SEED = 0
+REGRESSION_THRESHOLD = 0.9
+
+CONFIG = BetStrategyConfigAbsolut(
+	min_amount=0.001,
+	max_amount=10.0,
+	preffered_amount=1.0,
+	preffered_profit=0.1,
+	balance=1e12,
+)
+
+STRATEGIES = [BetOnClearFavorite, BetOnRealChanceIfOddsFake]
+
+
+def datasets(num_matches: int, csv_path: str = None) -> dict:
+	agencies = {
+		'synthetic': StoreAgency(SyntheticMatches(seed=SEED).store(num_matches), 'synthetic'),
+	}
+	if csv_path is not None:
+		store = Bet365(csv_path).store
+		rows = np.random.default_rng(SEED).choice(len(store), size=min(num_matches, len(store)), replace=False)
+		agencies['sampled'] = StoreAgency(store[np.sort(rows)], 'sampled')
+	return agencies
+
+
+def stages(agency, strategy_cls):
+	"""stage name -> (function to time, matches it plays), in hot path order."""
+	all_odds = list(agency.get_betting_oddset())
+	strategy = strategy_cls(deepcopy(CONFIG))
+	all_bets = [strategy.bet(bet_odds)[0] for bet_odds in all_odds]
+	settled = [agency.evaluate(placed_bets) for placed_bets in all_bets]
+	balances = np.cumsum([won - spent for spent, won in settled]) + CONFIG.balance
+
+	def odds_iteration():
+		for _ in agency.get_betting_oddset():
+			pass
+
+	def strategy_bet():
+		bet = strategy_cls(deepcopy(CONFIG)).bet
+		for bet_odds in all_odds:
+			bet(bet_odds)
+
+	def settlement():
+		for placed_bets in all_bets:
+			agency.evaluate(placed_bets)
+
+	def stats_update():
+		stats = StrategyStatistics()
+		stats.reserve(len(all_odds))
+		for placed_bets, (spent, won), balance in zip(all_bets, settled, balances):
+			stats.update(
+				spent, won, balance,
+				odds_bet_on=[pb.bet_odds.odds_of(pb.selection) for pb in placed_bets],
+				bet_num=len(placed_bets),
+			)
+
+	filled = Simulation([agency], [strategy_cls(deepcopy(CONFIG))])
+	filled.progress = False
+	filled.simulate()
+
+	def stats_to_df():
+		filled.stats_to_df()
+
+	def simulate(vectorized):
+		def run():
+			simulation = Simulation([agency], [strategy_cls(deepcopy(CONFIG))], vectorized=vectorized)
+			simulation.progress = False
+			simulation.simulate()
+		return run
+
+	return {
+		'odds_iteration': (odds_iteration, len(all_odds)),
+		'strategy_bet': (strategy_bet, len(all_odds)),
+		'settlement': (settlement, len(all_odds)),
+		'stats_update': (stats_update, len(all_odds)),
+		'stats_to_df': (stats_to_df, len(all_odds)),
+		'simulate': (simulate(False), len(all_odds)),
+		'simulate_vectorized': (simulate(True), len(all_odds)),
+	}
+
+
+def measure(function, num_matches: int, repeat: int) -> dict:
+	"""Best of `repeat` timings, then the peak memory of one more traced run."""
+	seconds = []
+	for _ in range(repeat):
+		start = time.perf_counter()
+		function()
+		seconds.append(time.perf_counter() - start)
+
+	tracemalloc.start()
+	function()
+	_, peak = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+
+	best = min(seconds)
+	return {
+		'seconds': best,
+		'matches_per_sec': num_matches / best if best > 0 else float('inf'),
+		'peak_bytes': peak,
+		'num_matches': num_matches,
+	}
+
+
+def git_revision() -> str:
+	try:
+		return subprocess.check_output(
+			['git', 'rev-parse', '--short', 'HEAD'],
+			cwd=os.path.dirname(os.path.abspath(__file__)),
+			stderr=subprocess.DEVNULL,
+		).decode().strip()
+	except (OSError, subprocess.CalledProcessError):
+		return 'unknown'
+
+
+def run(num_matches: int, csv_path: str = None, repeat: int = 3) -> dict:
+	results = {}
+	for dataset, agency in datasets(num_matches, csv_path).items():
+		for strategy_cls in STRATEGIES:
+			for stage, (function, stage_matches) in stages(agency, strategy_cls).items():
+				results[f"{dataset}/{strategy_cls.__name__}/{stage}"] = measure(function, stage_matches, repeat)
+
+	return {
+		'meta': {
+			'revision': git_revision(),
+			'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+			'python': platform.python_version(),
+			'numpy': np.__version__,
+			'machine': platform.machine(),
+			'num_matches': num_matches,
+			'repeat': repeat,
+		},
+		'results': results,
+	}
+
+
+def compare(old: dict, new: dict):
+	"""Speedup (new matches/sec over old) of every benchmark present in both."""
+	print(f"{old['meta']['revision']} -> {new['meta']['revision']}")
+	print(f"{'benchmark':<60} {'old m/s':>12} {'new m/s':>12} {'speedup':>8}")
+	for name, result in new['results'].items():
+		if name not in old['results']:
+			continue
+		old_rate, new_rate = old['results'][name]['matches_per_sec'], result['matches_per_sec']
+		speedup = new_rate / old_rate if old_rate else float('inf')
+		flag = "  REGRESSION" if speedup < REGRESSION_THRESHOLD else ""
+		print(f"{name:<60} {old_rate:>12.0f} {new_rate:>12.0f} {speedup:>7.2f}x{flag}")
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument('--matches', type=int, default=20000)
+	parser.add_argument('--csv', default=None, help="csv to sample the 'sampled' dataset from")
+	parser.add_argument('--repeat', type=int, default=3)
+	parser.add_argument('--out', default='bench_hot_path.json')
+	parser.add_argument('--compare', default=None, help="earlier result file to compare against")
+	args = parser.parse_args()
+
+	results = run(args.matches, args.csv, args.repeat)
+	with open(args.out, 'w') as out_file:
+		json.dump(results, out_file, indent=2)
+
+	print(f"{'benchmark':<60} {'matches/sec':>12} {'peak MB':>9}")
+	for name, result in results['results'].items():
+		print(f"{name:<60} {result['matches_per_sec']:>12.0f} {result['peak_bytes'] / 2**20:>9.1f}")
+
+	if args.compare is not None:
+		with open(args.compare) as old_file:
+			compare(json.load(old_file), results)
+
+
+if __name__ == "__main__":
+	main()
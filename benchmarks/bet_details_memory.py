@@ -0,0 +1,110 @@
+"""
+	Memory and allocation cost per match of the odds representations:
+		* dict: the previous BetOdds/PlacedBet, a defaultdict of odds and plain objects
+		* slotted: the current __slots__ BetOdds/PlacedBet with a 5 slot price array
+		* columnar: a MatchStore row, no python object per match at all
+
+	python benchmarks/bet_details_memory.py [num_matches]
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from collections import defaultdict
+from bet_details import BetOdds, PlacedBet, BetSelection, SELECTION_CODES
+
+
+class DictBetOdds(object):
+	"""The dict backed BetOdds this benchmark compares against."""
+	def __init__(self, id, teams, odds, competition, eliminatory, date=""):
+		if len(teams) != 2 or len(odds) < 3 or min(odds.values()) < 1.0:
+			raise ValueError()
+		self.id = id
+		self.teams = teams
+		self.odds = defaultdict(lambda: 1.0)
+		self.odds.update(odds)
+		self.competition = competition
+		self.eliminatory_scheme = eliminatory
+		self.date = date
+
+	def favorite_team(self):
+		return BetSelection.ONE \
+			if self.odds[BetSelection.ONE] < self.odds[BetSelection.TWO] \
+			else BetSelection.TWO
+
+
+class DictPlacedBet(object):
+	def __init__(self, bet_odds, selection, amount):
+		self.bet_odds = bet_odds
+		self.selection = selection
+		self.amount = amount
+
+
+def random_prices(num_matches: int) -> list:
+	rng = np.random.default_rng(0)
+	prices = np.zeros((num_matches, len(SELECTION_CODES)))
+	prices[:, :3] = rng.uniform(1.05, 10.0, size=(num_matches, 3))
+	return prices.tolist()
+
+
+def make_dict(idx, prices):
+	bet_odds = DictBetOdds(
+		id = idx,
+		teams = ["Home", "Away"],
+		odds = {
+			BetSelection.ONE: prices[0],
+			BetSelection.X:   prices[1],
+			BetSelection.TWO: prices[2],
+		},
+		competition = "E0",
+		eliminatory = 0,
+	)
+	return bet_odds, DictPlacedBet(bet_odds, bet_odds.favorite_team(), 1.0)
+
+
+def make_slotted(idx, prices):
+	bet_odds = BetOdds.from_prices(
+		id = idx,
+		teams = ("Home", "Away"),
+		prices = prices,
+		competition = "E0",
+		eliminatory = 0,
+	)
+	return bet_odds, PlacedBet(bet_odds, bet_odds.favorite_team(), 1.0)
+
+
+def measure(make, all_prices):
+	start = time.perf_counter()
+	for idx, prices in enumerate(all_prices):
+		make(idx, prices)
+	elapsed = time.perf_counter() - start
+
+	tracemalloc.start()
+	kept = [make(idx, prices) for idx, prices in enumerate(all_prices)]
+	allocated, _ = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+
+	return allocated / len(kept), elapsed / len(all_prices) * 1e9
+
+
+def main():
+	num_matches = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+	all_prices = random_prices(num_matches)
+	# prices are floats already, don't count them
+	columnar_bytes = 8 * len(SELECTION_CODES) + 1 + 8 + 3 * 4
+
+	print(f"{num_matches} matches (BetOdds + one PlacedBet each)")
+	print(f"{'representation':<12} {'bytes/match':>12} {'ns/match':>10}")
+	for name, make in [("dict", make_dict), ("slotted", make_slotted)]:
+		bytes_per_match, ns_per_match = measure(make, all_prices)
+		print(f"{name:<12} {bytes_per_match:>12.0f} {ns_per_match:>10.0f}")
+	print(f"{'columnar':<12} {columnar_bytes:>12.0f} {'-':>10}")
+
+
+if __name__ == "__main__":
+	main()
@@ -1,6 +1,8 @@
-from collections import defaultdict
+import numpy as np
+
+from array import array
 from enum import Enum
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Sequence, Tuple
 
 
 def prob_2_odd(prob):
@@ -27,12 +29,57 @@ def bet_selection_to_ft_result(selection: str) -> List[str]:
 	return [SELECTION_2_FT_RESULT[symbol] for symbol in selection]
 
 
+# Integer codes used by the columnar code paths (match store, settlement, vectorized
+# strategies). Simple selections share their code with the full time result they win on.
+SELECTION_CODES = [
+	BetSelection.ONE,
+	BetSelection.X,
+	BetSelection.TWO,
+	BetSelection.ONEX,
+	BetSelection.XTWO,
+]
+SELECTION_2_CODE = {selection: code for code, selection in enumerate(SELECTION_CODES)}
+ONE_CODE, X_CODE, TWO_CODE, ONEX_CODE, XTWO_CODE = range(len(SELECTION_CODES))
+NO_BET_CODE = -1
+
+FT_RESULT_UNKNOWN = -1
+FT_RESULT_2_CODE = {
+	'H': 0,
+	'D': 1,
+	'A': 2,
+}
+
+
+# Array versions of the BetOdds helpers, over an odds matrix with one row per match and
+# one column per selection code. They return selection codes.
+
+def odds_of_codes(odds: np.ndarray, selections: np.ndarray) -> np.ndarray:
+	return np.take_along_axis(odds, selections.reshape(-1, 1), axis=1)[:, 0]
+
+
+def favorite_team_codes(odds: np.ndarray) -> np.ndarray:
+	return np.where(odds[:, ONE_CODE] < odds[:, TWO_CODE], ONE_CODE, TWO_CODE)
+
+
+def underdog_team_codes(odds: np.ndarray) -> np.ndarray:
+	return np.where(odds[:, TWO_CODE] < odds[:, ONE_CODE], ONE_CODE, TWO_CODE)
+
+
+def favorite_odd_codes(odds: np.ndarray) -> np.ndarray:
+	favorite_team = favorite_team_codes(odds)
+	return np.where(odds_of_codes(odds, favorite_team) > odds[:, X_CODE], X_CODE, favorite_team)
+
+
 class BetOdds(object):
 	"""
 		Abstraction over what options we can bet on. It only offers the very trivial ones
 		like rates for home team win, away, combined win & draw, etc.
 
+		The odds are kept in a 5 slot float array indexed by selection code (see
+		SELECTION_CODES), 0 for the selections that aren't offered.
 	"""
+	__slots__ = ('id', 'teams', 'prices', 'competition', 'eliminatory_scheme', 'date')
+
 	def __init__(
 		self,
 		id: int,
@@ -51,48 +98,79 @@ class BetOdds(object):
 		if min(odds.values()) < 1.0:
 			raise ValueError(f"Odds value are invalid: {odds}. Values needs to be greater than 1.")
 
+		prices = array('d', bytes(8 * len(SELECTION_CODES)))
+		for selection, odd in odds.items():
+			prices[SELECTION_2_CODE[selection]] = odd
+
 		self.id = id
 		self.teams = teams
-		self.odds = defaultdict(lambda: 1.0)
-		self.odds.update(odds)
+		self.prices = prices
 		self.competition = competition
 		self.eliminatory_scheme = eliminatory
 		self.date = date
 
+	@classmethod
+	def from_prices(
+		cls,
+		id: int,
+		teams: Tuple[str, str],
+		prices: Sequence[float],
+		competition: Optional[str],
+		eliminatory: Optional[int],
+		date: Optional[str] = ""
+	) -> 'BetOdds':
+		"""Unchecked constructor, for odds already validated (e.g. by MatchStore.valid)."""
+		bet_odds = cls.__new__(cls)
+		bet_odds.id = id
+		bet_odds.teams = teams
+		bet_odds.prices = array('d', prices)
+		bet_odds.competition = competition
+		bet_odds.eliminatory_scheme = eliminatory
+		bet_odds.date = date
+		return bet_odds
+
+	@property
+	def odds(self) -> Dict[str, float]:
+		"""selection -> odd of the offered selections."""
+		return {
+			selection: price
+			for selection, price in zip(SELECTION_CODES, self.prices) if price
+		}
+
 	def eliminatory(self) -> bool:
 		return (self.eliminatory_scheme == 1)
 
 	def same_odds_for_win(self) -> bool:
-		return self.odds[BetSelection.ONE] == self.odds[BetSelection.TWO]
+		return self.prices[ONE_CODE] == self.prices[TWO_CODE]
 
 	def favorite_odd(self) -> str:
-		favorite_team = self.favorite_team()
-		if self.odds_of(favorite_team) > self.odds_of(BetSelection.X):
-			return BetSelection.X
-		return favorite_team
+		prices = self.prices
+		if prices[ONE_CODE] < prices[TWO_CODE]:
+			return BetSelection.X if prices[ONE_CODE] > prices[X_CODE] else BetSelection.ONE
+		return BetSelection.X if prices[TWO_CODE] > prices[X_CODE] else BetSelection.TWO
 
 	def favorite_team(self) -> str:
 		return BetSelection.ONE \
-			if self.odds[BetSelection.ONE] < self.odds[BetSelection.TWO] \
+			if self.prices[ONE_CODE] < self.prices[TWO_CODE] \
 			else BetSelection.TWO
 
 	def underdog_team(self) -> str:
 		return BetSelection.ONE \
-			if self.odds[BetSelection.TWO] < self.odds[BetSelection.ONE] \
+			if self.prices[TWO_CODE] < self.prices[ONE_CODE] \
 			else BetSelection.TWO
 
 	def odds_of(self, selection: str) -> float:
-		return self.odds[selection] if selection in self.odds else 0
+		return self.prices[SELECTION_2_CODE[selection]]
 
 	def __str__(self) -> str:
 		t1_repr = self.teams[0][:5]
 		t2_repr = self.teams[1][:5]
 
-		win1_odd = "%0.2f" % self.odds[BetSelection.ONE]
-		win1_draw_odd = "%0.2f" % self.odds[BetSelection.ONEX]
-		draw_odd = "%0.2f" % self.odds[BetSelection.X]
-		win2_draw_odd = "%0.2f" % self.odds[BetSelection.XTWO]
-		win2_odd = "%0.2f" % self.odds[BetSelection.TWO]
+		win1_odd = "%0.2f" % self.prices[ONE_CODE]
+		win1_draw_odd = "%0.2f" % self.prices[ONEX_CODE]
+		draw_odd = "%0.2f" % self.prices[X_CODE]
+		win2_draw_odd = "%0.2f" % self.prices[XTWO_CODE]
+		win2_odd = "%0.2f" % self.prices[TWO_CODE]
 
 		return f"[{t1_repr}]" + \
 				f" {win1_odd} |1x {win1_draw_odd}|" + \
@@ -102,6 +180,8 @@ class BetOdds(object):
 
 
 class PlacedBet(object):
+	__slots__ = ('bet_odds', 'selection', 'amount')
+
 	def __init__(
 		self,
 		bet_odds: BetOdds,
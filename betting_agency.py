@@ -1,114 +1,173 @@
-from bet_details import BetOdds, PlacedBet, BetSelection, bet_selection_to_ft_result
-from typing import List, Tuple, Optional
+import settlement
+from bet_details import BetOdds, PlacedBet, BetSelection, SELECTION_2_CODE
+from match_store import MatchStore, MATCH_STORE_CACHE_DIR
+from synthetic import SyntheticMatches
+from typing import List, Tuple, Optional, Iterator
 
+import numpy as np
 import pandas as pd
 
 class BettingAgency(object):
-	"""Abstraction over the betting agency."""
+	"""
+		Abstraction over the betting agency.
+		Agencies backed by a MatchStore only need to set `store` and `num_games`.
+	"""
+	store: Optional[MatchStore] = None
+	num_games: float = 1.0
+
+	def limit(self) -> int:
+		"""Number of store rows the agency plays: a fraction of them if num_games <= 1."""
+		if self.num_games <= 1.0:
+			return int(len(self.store) * self.num_games)
+		return min(int(self.num_games), len(self.store))
+
+	def matches(self) -> MatchStore:
+		"""The played matches as a zero-copy view of the store."""
+		return self.store[:self.limit()]
+
+	def get_betting_oddset(self) -> Iterator[BetOdds]:
+		return self.store.iter_bet_odds(stop=self.limit())
 
-	def get_betting_oddset(self, count: int = 1):
-		...
+	def settle(
+		self,
+		match_idx: np.ndarray,
+		selection: np.ndarray,
+		amount: np.ndarray,
+		odds: Optional[np.ndarray] = None,
+	) -> Tuple[np.ndarray, np.ndarray]:
+		"""
+			Settles a batch of bets on store rows `match_idx`, `selection` being selection codes.
+			Odds default to the ones in the store. Returns the spent and won amount per bet.
+		"""
+		match_idx = np.asarray(match_idx, dtype=np.int64)
+		selection = np.asarray(selection, dtype=np.int64)
+		if odds is None:
+			odds = self.store.odds[match_idx, selection]
+
+		return settlement.settle(
+			self.store.result_bits(), match_idx, selection, amount, odds
+		)
 
-	def evaluate(self, csv, placed_bets: List[PlacedBet]) -> Tuple[float, float]:
-		spent = 0
-		earned = 0
+	def settle_vectorized(
+		self,
+		match_idx: np.ndarray,
+		odds: np.ndarray,
+		bets: Tuple[np.ndarray, np.ndarray],
+	) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+		"""
+			settlement.settle_picks of the bet_vectorized (selections, amounts) of a strategy
+			on store rows match_idx, odds being the odds of those rows.
+		"""
+		selections, amounts = bets
+		hits = settlement.selection_hits(self.store.result_bits()[match_idx])
+		return settlement.settle_picks(odds, hits, selections, amounts)
+
+	def evaluate(self, placed_bets: List[PlacedBet]) -> Tuple[float, float]:
+		if not placed_bets:
+			return 0, 0
+
+		spent, won = self.settle(
+			match_idx=[placed_bet.bet_odds.id for placed_bet in placed_bets],
+			selection=[SELECTION_2_CODE[placed_bet.selection] for placed_bet in placed_bets],
+			amount=[placed_bet.amount for placed_bet in placed_bets],
+			odds=[placed_bet.bet_odds.odds_of(placed_bet.selection) for placed_bet in placed_bets],
+		)
+		return float(spent.sum()), float(won.sum())
 
-		for placed_bet in placed_bets:
-			selected_outcomes = bet_selection_to_ft_result(placed_bet.selection)
-			match = csv.iloc[placed_bet.bet_odds.id]
 
-			if match.FullTimeResult in selected_outcomes:
-				earned += placed_bet.amount * placed_bet.bet_odds.odds_of(placed_bet.selection)
-			spent += placed_bet.amount
+class StoreAgency(BettingAgency):
+	"""An agency over an existing store (a window or a reordering of another agency's matches)."""
+	def __init__(self, store: MatchStore, name: str, num_games: float = 1.0):
+		self.store = store
+		self.num_games = num_games
+		self.name = name
 
-		return spent, earned
+	def __repr__(self):
+		return self.name
 
 
 class Bet365(BettingAgency):
+	ODDS_COLUMNS = ('Bet365homewinodds', 'Bet365drawodds', 'Bet365awaywinodds')
+	CONSTRAINT_COLUMNS = {
+		'LeagueDivision': 'league',
+		'HomeTeam': 'home_team',
+		'AwayTeam': 'away_team',
+		'Team': 'team',
+		'MatchDate': 'date',
+	}
+
 	def __init__(
 		self,
 		csv_path:str,
 		num_games : float = 1.0,
-		constraints : Optional[List[Tuple[str, object]]] = []
+		constraints : Optional[List[Tuple[str, object]]] = [],
+		cache_dir : Optional[str] = MATCH_STORE_CACHE_DIR,
 	):
+		"""
+			constraints: (column, value) pairs the played matches must all match, with
+				column one of CONSTRAINT_COLUMNS. The value is a name or a list/set of
+				names, for MatchDate a date or a (start, end) tuple (see MatchStore.rows_where).
+			cache_dir: where the parsed csv is snapshotted, None to always parse it.
+		"""
+		self.csv_path = csv_path
 		self.num_games = num_games
-		self.csv = pd.read_csv(
-			csv_path,
-			parse_dates=['MatchDate']
-		)
-
-		for contraint in constraints:
-			self.csv = self.csv[self.csv[contraint[0]] == contraint[0]]
+		self._csv = None
+
+		unknown = [column for column, _ in constraints or [] if column not in self.CONSTRAINT_COLUMNS]
+		if unknown:
+			raise ValueError(f"Can't constrain {unknown}, the constraint columns are: {list(self.CONSTRAINT_COLUMNS)}")
+
+		self.store = MatchStore.from_csv(csv_path, odds_columns=self.ODDS_COLUMNS, cache_dir=cache_dir)
+		# store rows are csv rows, these are the ones matching the constraints
+		self.rows = self.store.query([
+			(self.CONSTRAINT_COLUMNS[column], value) for column, value in constraints or []
+		])
+		if constraints:
+			self.store = self.store[self.rows]
+
+	@property
+	def csv(self) -> pd.DataFrame:
+		"""
+			The rows of the csv matching the constraints, row i being the match i of the
+			store. Only parsed when asked for, the simulation works on the store.
+		"""
+		if self._csv is None:
+			self._csv = pd.read_csv(
+				self.csv_path,
+				parse_dates=['MatchDate']
+			).iloc[self.rows].reset_index(drop=True)
+		return self._csv
 
 	def __repr__(self):
 		return "B365"
 
-
-	def get_betting_oddset(self) -> List[BetOdds]:
-		if self.num_games <= 1.0:
-			limit = int(self.csv.shape[0] * self.num_games)
-		else:
-			limit = int(self.num_games)
-
-		for idx, row in self.csv.iterrows():
-			if idx >= limit:
-				break
-			try:
-				odds = BetOdds(
-					id = idx,
-					teams = [row.HomeTeam, row.AwayTeam],
-					odds = {
-						BetSelection.ONE: row.Bet365homewinodds,
-						BetSelection.TWO: row.Bet365drawodds,
-						BetSelection.X:   row.Bet365awaywinodds,
-					},
-					competition = row.LeagueDivision,
-					eliminatory = 0,
-					date = row['MatchDate'],
-				)
-			except ValueError:
-				continue
-			yield odds
-
 class RandomIdealAgency(BettingAgency):
+	"""
+		Synthetic agency with num_games seeded random matches, see synthetic.SyntheticMatches
+		for the extra arguments (margin, alpha, leagues, ...). Agencies without a seed are
+		seeded with their id, so two of them play different but reproducible matches.
+	"""
 	ID = 0
 	def __init__(
 		self,
 		num_games: int = 1000000,
+		seed: Optional[int] = None,
+		**synthetic_args,
 	):
 		self.num_games = num_games
-		self.id = ID
+		self.id = RandomIdealAgency.ID
 		RandomIdealAgency.ID += 1
 
-		self.domains = {
-			"divisions": ["Liga1", "L2", "L0", "L3"],
-			"Teams": [f"T{id}" for id in range(0, 1000)]
-		}
+		self.matches_generator = SyntheticMatches(
+			seed=self.id if seed is None else seed,
+			**synthetic_args,
+		)
+		self.store = self.matches_generator.store(int(num_games))
 
-	def __str__(self):
+	def __repr__(self):
 		return "Random#" + str(self.id)
 
 
-	def get_betting_oddset(self) -> List[BetOdds]:
-		for idx in range(0, self.num_games):
-			try:
-				odds = BetOdds(
-					id = idx,
-					teams = [row.HomeTeam, row.AwayTeam],
-					odds = {
-						BetSelection.ONE: row.Bet365homewinodds,
-						BetSelection.TWO: row.Bet365drawodds,
-						BetSelection.X:   row.Bet365awaywinodds,
-					},
-					competition = row.LeagueDivision,
-					eliminatory = 0,
-					date = row['MatchDate'],
-				)
-			except ValueError:
-				continue
-			yield odds
-
-
 def main():
 	a = Bet365('/home/rotaru/Desktop/play/bet-agent/data/b365_big_leagues_matches.csv')
 	for odds in a.get_betting_oddset():
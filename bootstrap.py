@@ -0,0 +1,234 @@
+"""
+	Monte Carlo robustness of a strategy: instead of the single historical order, the
+	strategy is played over thousands of resampled orderings of the same matches and we
+	look at how often it goes out of money and how deep its drawdowns get.
+
+	Orderings are either permutations of the matches or moving block bootstraps (blocks of
+	consecutive matches, wrapping around, keeping the short range structure of the history).
+	Every path has its own seed spawned from `seed`, so the result doesn't depend on how the
+	paths are split into chunks and workers.
+
+	Strategies implementing bet_vectorized win or lose the same amount on a match whatever
+	the order, so the per match results are computed once and a chunk of paths is a
+	(paths x matches) cumsum. The others are played path by path through Simulation.
+	Either way only `chunk_size` paths are in memory at once.
+"""
+
+import numpy as np
+import pandas as pd
+
+from copy import deepcopy
+from typing import Dict, List, Optional, Sequence
+
+from betting_agency import BettingAgency, StoreAgency
+from parallel import fork_map
+from simulation import Simulation
+from strategy.interface import BettingStrategy
+from strategy.stats import OUT_OF_MONEY_BALANCE
+
+PERMUTATION = "permutation"
+BLOCK = "block"
+
+
+def path_order(rng: np.random.Generator, num_matches: int, method: str, block_size: int) -> np.ndarray:
+	"""The order a path plays the matches in, as indices of the matches."""
+	if method == PERMUTATION:
+		return rng.permutation(num_matches)
+	if method == BLOCK:
+		num_blocks = -(-num_matches // block_size)
+		starts = rng.integers(0, num_matches, size=num_blocks)
+		order = (starts.reshape(-1, 1) + np.arange(block_size)) % num_matches
+		return order.ravel()[:num_matches]
+	raise ValueError(f"Unknown resampling method: {method}")
+
+
+def match_results(agency: BettingAgency, strategy: BettingStrategy):
+	"""
+		(won - spent, number of bets) per valid match for a strategy implementing
+		bet_vectorized, None otherwise.
+	"""
+	matches = agency.matches()
+	match_idx = np.flatnonzero(matches.valid())
+	odds = matches.odds[match_idx]
+
+	bets = strategy.bet_vectorized(odds)
+	if bets is None:
+		return None
+
+	placed, _, spent, won = agency.settle_vectorized(match_idx, odds, bets)
+	return won - spent, placed.sum(axis=1)
+
+
+class BootstrapResult(object):
+	"""Per path outcomes of a bootstrap run, one entry per path."""
+	def __init__(self, strategy: str, balance: float, num_paths: int):
+		self.strategy = strategy
+		self.balance = balance
+		self.final_balance = np.zeros(num_paths)
+		self.out_of_money = np.zeros(num_paths, dtype=bool)
+		self.matches_played = np.zeros(num_paths, dtype=np.int64)
+		self.num_bets = np.zeros(num_paths, dtype=np.int64)
+		self.peak_balance = np.zeros(num_paths)
+		self.max_drawdown = np.zeros(num_paths)
+
+	def fill(self, paths: slice, chunk: Dict[str, np.ndarray]):
+		for name, values in chunk.items():
+			getattr(self, name)[paths] = values
+
+	def ruin_probability(self) -> float:
+		return float(np.mean(self.out_of_money))
+
+	def summary(self, quantiles: Sequence[float] = (0.5, 0.9, 0.95, 0.99)) -> Dict:
+		summary = {
+			"strategy": self.strategy,
+			"num_paths": len(self.final_balance),
+			"ruin_probability": self.ruin_probability(),
+			"mean_profit": float(np.mean(self.final_balance - self.balance)),
+			"median_matches_to_ruin": float(np.median(self.matches_played[self.out_of_money]))
+				if self.out_of_money.any() else np.nan,
+		}
+		for q in quantiles:
+			summary[f"max_drawdown_q{q:g}"] = float(np.quantile(self.max_drawdown, q))
+		for q in quantiles:
+			summary[f"profit_q{1 - q:g}"] = float(np.quantile(self.final_balance - self.balance, 1 - q))
+		return summary
+
+	def to_df(self) -> pd.DataFrame:
+		return pd.DataFrame({
+			"final_balance": self.final_balance,
+			"out_of_money": self.out_of_money,
+			"matches_played": self.matches_played,
+			"num_bets": self.num_bets,
+			"peak_balance": self.peak_balance,
+			"max_drawdown": self.max_drawdown,
+		})
+
+
+class Bootstrap(object):
+	def __init__(
+		self,
+		agency: BettingAgency,
+		num_paths: int = 1000,
+		method: str = PERMUTATION,
+		block_size: int = 50,
+		seed: int = 0,
+		chunk_size: int = 256,
+		num_workers: Optional[int] = None,
+	):
+		"""
+			method: PERMUTATION or BLOCK (moving blocks of block_size consecutive matches).
+			chunk_size: paths resampled and played at once, bounds the memory to about
+				chunk_size x matches balances.
+			num_workers: processes the chunks are played on, None for one per core.
+		"""
+		if method not in (PERMUTATION, BLOCK):
+			raise ValueError(f"Unknown resampling method: {method}")
+
+		self.agency = agency
+		self.num_paths = num_paths
+		self.method = method
+		self.block_size = block_size
+		self.seed = seed
+		self.chunk_size = chunk_size
+		self.num_workers = num_workers
+
+		matches = agency.matches()
+		self.match_idx = np.flatnonzero(matches.valid())
+		self.seeds = np.random.SeedSequence(seed).spawn(num_paths)
+
+	def chunks(self) -> List[slice]:
+		return [
+			slice(start, min(start + self.chunk_size, self.num_paths))
+			for start in range(0, self.num_paths, self.chunk_size)
+		]
+
+	def orders(self, paths: slice) -> np.ndarray:
+		"""(paths, matches) orderings of the valid matches."""
+		return np.stack([
+			path_order(np.random.default_rng(seed), len(self.match_idx), self.method, self.block_size)
+			for seed in self.seeds[paths]
+		]) if paths.stop > paths.start else np.zeros((0, len(self.match_idx)), dtype=np.int64)
+
+	def run(self, strategy: BettingStrategy) -> BootstrapResult:
+		"""Plays num_paths resampled orderings, the strategy itself is left untouched."""
+		result = BootstrapResult(str(strategy), strategy.config.balance, self.num_paths)
+		per_match = match_results(self.agency, strategy)
+		chunks = self.chunks()
+
+		def run_chunk(chunk_idx):
+			orders = self.orders(chunks[chunk_idx])
+			if per_match is not None:
+				return self._play_vectorized(strategy.config.balance, per_match, orders)
+			return self._play_simulated(strategy, orders)
+
+		for paths, chunk in zip(chunks, fork_map(run_chunk, len(chunks), self.num_workers)):
+			result.fill(paths, chunk)
+		return result
+
+	def _play_vectorized(self, balance: float, per_match, orders: np.ndarray) -> Dict[str, np.ndarray]:
+		deltas, bet_nums = per_match
+		num_paths, num_matches = orders.shape
+		if num_matches == 0:
+			return self._no_matches(balance, num_paths)
+
+		start = np.full((num_paths, 1), float(balance))
+		balances = np.cumsum(np.concatenate((start, deltas[orders]), axis=1), axis=1)[:, 1:]
+
+		out_of_money = balances <= OUT_OF_MONEY_BALANCE
+		ruined = out_of_money.any(axis=1)
+		played = np.where(ruined, out_of_money.argmax(axis=1) + 1, num_matches)
+
+		# the strategy stops once out of money: freeze the balance after that
+		after_ruin = np.arange(num_matches) >= played.reshape(-1, 1)
+		last_balance = balances[np.arange(num_paths), played - 1]
+		balances = np.where(after_ruin, last_balance.reshape(-1, 1), balances)
+
+		peaks = np.maximum.accumulate(balances, axis=1)
+		num_bets = np.where(after_ruin, 0, bet_nums[orders]).sum(axis=1)
+		return {
+			"final_balance": last_balance,
+			"out_of_money": ruined,
+			"matches_played": played,
+			"num_bets": num_bets,
+			"peak_balance": peaks[:, -1],
+			"max_drawdown": np.max(peaks - balances, axis=1),
+		}
+
+	def _play_simulated(self, strategy: BettingStrategy, orders: np.ndarray) -> Dict[str, np.ndarray]:
+		num_paths = orders.shape[0]
+		chunk = self._no_matches(strategy.config.balance, num_paths)
+		store = self.agency.matches()
+
+		for path_idx, order in enumerate(orders):
+			path_strategy = deepcopy(strategy)
+			simulation = Simulation(
+				agencies=[StoreAgency(store[self.match_idx[order]], str(self.agency))],
+				strategies=[path_strategy],
+				keep_history=False,
+			)
+			simulation.progress = False
+			simulation.simulate()
+
+			stats = simulation.strategy2statistics[(str(self.agency), str(path_strategy))]
+			chunk["final_balance"][path_idx] = path_strategy.config.balance
+			chunk["out_of_money"][path_idx] = stats.is_out_of_money
+			chunk["matches_played"][path_idx] = stats.num_matches
+			chunk["num_bets"][path_idx] = stats.num_bets
+			chunk["peak_balance"][path_idx] = stats.peak_balance
+			chunk["max_drawdown"][path_idx] = stats.max_drawdown
+		return chunk
+
+	def _no_matches(self, balance: float, num_paths: int) -> Dict[str, np.ndarray]:
+		return {
+			"final_balance": np.full(num_paths, float(balance)),
+			"out_of_money": np.zeros(num_paths, dtype=bool),
+			"matches_played": np.zeros(num_paths, dtype=np.int64),
+			"num_bets": np.zeros(num_paths, dtype=np.int64),
+			"peak_balance": np.full(num_paths, -np.inf),
+			"max_drawdown": np.zeros(num_paths),
+		}
+
+
+def bootstrap_strategies(bootstrap: Bootstrap, strategies: List[BettingStrategy]) -> pd.DataFrame:
+	"""One summary() row per strategy."""
+	return pd.DataFrame([bootstrap.run(strategy).summary() for strategy in strategies])
@@ -0,0 +1,117 @@
+"""
+	Snapshots of a simulation, to extend it with newly appended matches instead of playing
+	the whole history again.
+
+	A checkpoint holds, for every agency, the number of store rows played and the
+	fingerprint of those rows, and for every strategy (every variant of a StrategyBatch)
+	its state (StrategyState history and counters, config.balance, ...) and statistics.
+
+		simulation.simulate()
+		simulation.checkpoint().save(path)
+		...  # new rows appended to the csv
+		simulation = Simulation([Bet365(csv_path)], strategies)
+		simulation.resume(Checkpoint.load(path))
+
+	Resuming checks that the played rows are still a prefix of the store, then plays the
+	rows after it only. To checkpoint at a given match index, simulate an agency limited
+	to that many matches (num_games).
+"""
+
+import os
+import pickle
+
+from copy import deepcopy
+from typing import Dict, List, Tuple
+
+from betting_agency import BettingAgency, StoreAgency
+
+
+class Checkpoint(object):
+	def __init__(
+		self,
+		num_matches: Dict[str, int],
+		fingerprints: Dict[str, str],
+		statistics: Dict[Tuple[str, str], object],
+		states: Dict[str, Dict],
+		keep_history: bool,
+	):
+		"""
+			num_matches, fingerprints: per agency, the store rows played and their fingerprint.
+			statistics: per (agency, strategy name), as in Simulation.strategy2statistics.
+			states: per strategy name, the attributes of the strategy.
+		"""
+		self.num_matches = num_matches
+		self.fingerprints = fingerprints
+		self.statistics = statistics
+		self.states = states
+		self.keep_history = keep_history
+
+	@classmethod
+	def take(cls, simulation) -> 'Checkpoint':
+		"""Snapshot of a simulation after simulate(), independent of the objects it copies."""
+		num_matches, fingerprints = {}, {}
+		for agency in simulation.agencies:
+			matches = agency.matches()
+			num_matches[str(agency)] = len(matches)
+			fingerprints[str(agency)] = matches.fingerprint()
+
+		states = {}
+		for strategy in simulation.strategies:
+			for name, variant in zip(simulation.stats_names(strategy), simulation.variants(strategy)):
+				states[name] = deepcopy(variant.__dict__)
+
+		return cls(
+			num_matches,
+			fingerprints,
+			deepcopy(dict(simulation.strategy2statistics)),
+			states,
+			simulation.keep_history,
+		)
+
+	def save(self, path: str):
+		directory = os.path.dirname(os.path.abspath(path))
+		os.makedirs(directory, exist_ok=True)
+		with open(path + '.tmp', 'wb') as checkpoint_file:
+			pickle.dump(self, checkpoint_file, protocol=pickle.HIGHEST_PROTOCOL)
+		os.replace(path + '.tmp', path)
+
+	@classmethod
+	def load(cls, path: str) -> 'Checkpoint':
+		with open(path, 'rb') as checkpoint_file:
+			return pickle.load(checkpoint_file)
+
+	def restore(self, simulation):
+		"""Sets the state of the strategies of simulation and its statistics to the snapshot ones."""
+		if simulation.keep_history != self.keep_history:
+			raise ValueError(f"Checkpoint taken with keep_history={self.keep_history}")
+
+		for strategy in simulation.strategies:
+			for name, variant in zip(simulation.stats_names(strategy), simulation.variants(strategy)):
+				if name not in self.states:
+					raise ValueError(f"No strategy {name} in the checkpoint")
+				variant.__dict__.update(deepcopy(self.states[name]))
+
+		simulation.strategy2statistics.clear()
+		simulation.strategy2statistics.update(deepcopy(self.statistics))
+
+	def appended(self, agencies: List[BettingAgency]) -> List[StoreAgency]:
+		"""
+			The matches of every agency after the played ones, under the agency name.
+			Strategies play the agencies one after the other, so only the last one may have
+			new matches for the result to be the one of a full replay.
+		"""
+		appended = []
+		for agency_idx, agency in enumerate(agencies):
+			name = str(agency)
+			if name not in self.num_matches:
+				raise ValueError(f"No agency {name} in the checkpoint")
+
+			matches = agency.matches()
+			played = self.num_matches[name]
+			if len(matches) < played or matches[:played].fingerprint() != self.fingerprints[name]:
+				raise ValueError(f"The matches of {name} changed since the checkpoint, replay them")
+			if len(matches) > played and agency_idx != len(agencies) - 1:
+				raise ValueError(f"New matches in {name} but not in the last agency, replay them")
+
+			appended.append(StoreAgency(matches[played:], name))
+		return appended
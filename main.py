@@ -6,11 +6,14 @@ import matplotlib.pyplot as plt
 from copy import deepcopy
 
 from betting_agency import Bet365
+from results_io import save_results
+from result_cache import ResultCache
 from simulation import Simulation
 
 from strategy.config import *
 from strategy.stateless import *
 from strategy.stateful import *
+from strategy.batch import StrategyBatch
 
 
 def main():
@@ -36,20 +39,21 @@ def main():
 			Bet365('/home/rotaru/Desktop/play/bet-agent/data/b365_big_leagues_matches.csv') #, num_games=4000),
 		],
 		strategies = [
-			MartingaleStrategy(BetStrategyConfigAbsolut(
+			StrategyBatch(MartingaleStrategy, BetStrategyConfigAbsolut(
 				min_amount=0.000000000001,
 				max_amount=10.00,
-				preffered_amount=a,
+				preffered_amount=1.0,
 				preffered_profit=0.1,
 				balance=100,
-			), tag=str(a)) \
- 			for a in [\
+			), grid={'preffered_amount': [
 				#1.0, 0.5, 0.1, 0.05, 0.01, 0.005, 0.001, 0.0005, 0.0001, 0.00005, 0.00001, 0.000005, 0.000001
 				0.0001, #0.00005, 0.00001, 0.000005, 0.000001
-			]
+			]}),
 			#BetOnClearFavorite(deepcopy(cfg_abs)),
 			#BetOnRealChanceIfOddsFake(deepcopy(cfg_abs)),
-		]
+		],
+		num_workers=None,
+		cache=ResultCache(),
 	)
 
 	simulator.simulate()
@@ -65,7 +69,7 @@ def main():
 			by=['profit', 'profit_per_bet']
 		)
 	)
-	stats.to_csv('results/strategy_comparison.csv')
+	save_results(stats, 'results/strategy_comparison')
 
 	df_dct = {}
 	mx_len = -1
@@ -0,0 +1,322 @@
+"""
+	Columnar storage for the matches of an agency.
+
+	The csv is parsed once into contiguous numpy arrays (one per column) so that the
+	simulation and the strategies can walk or slice the matches without building a pandas
+	row for every match. Teams and leagues are stored as categorical int codes.
+
+	Parsed csvs are snapshotted on disk (see MatchStore.from_csv): later runs memory map the
+	columns instead of parsing the csv again, and processes opening the same snapshot share
+	its pages.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import numpy as np
+import pandas as pd
+
+import settlement
+from bet_details import BetOdds, SELECTION_CODES, FT_RESULT_2_CODE, FT_RESULT_UNKNOWN
+from typing import List, Optional, Tuple, Iterator, Dict
+
+MATCH_STORE_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'match_store')
+
+
+class MatchStore(object):
+	"""
+		Matches held as numpy columns, in the order they are played.
+
+		odds: (matches, 5) float array, one column per selection code (see
+			bet_details.SELECTION_CODES), 0 when the agency doesn't offer the selection.
+			The array is column major, so every odds column is contiguous.
+		result: int8 full time result codes (bet_details.FT_RESULT_2_CODE), -1 if unknown
+		date: int64 nanoseconds since epoch
+		home_team, away_team: int32 codes into `teams`
+		league: int32 codes into `leagues`
+
+		Slicing with a slice (store[a:b]) returns a store whose columns are views of this one.
+	"""
+	ITER_CHUNK = 4096
+	ARRAY_COLUMNS = ('odds', 'result', 'date', 'home_team', 'away_team', 'league')
+
+	def __init__(
+		self,
+		odds: np.ndarray,
+		result: np.ndarray,
+		date: np.ndarray,
+		home_team: np.ndarray,
+		away_team: np.ndarray,
+		league: np.ndarray,
+		teams: List[str],
+		leagues: List[str],
+	):
+		if odds.ndim != 2 or odds.shape[1] != len(SELECTION_CODES):
+			raise ValueError(f"Odds should have one column per selection but given shape: {odds.shape}")
+
+		self.odds = odds
+		self.result = result
+		self.date = date
+		self.home_team = home_team
+		self.away_team = away_team
+		self.league = league
+		self.teams = teams
+		self.leagues = leagues
+		self._valid = None
+		self._result_bits = None
+		self._fingerprint = None
+		self._indexes = {}
+
+	@classmethod
+	def from_frame(
+		cls,
+		frame: pd.DataFrame,
+		odds_columns: Tuple[str, str, str],
+	) -> 'MatchStore':
+		"""odds_columns are the names of the (home win, draw, away win) odds columns."""
+		num_matches = frame.shape[0]
+		home_col, draw_col, away_col = odds_columns
+
+		odds = np.zeros((num_matches, len(SELECTION_CODES)), dtype=np.float64, order='F')
+		odds[:, 0] = frame[home_col].to_numpy(dtype=np.float64)
+		odds[:, 1] = frame[draw_col].to_numpy(dtype=np.float64)
+		odds[:, 2] = frame[away_col].to_numpy(dtype=np.float64)
+
+		result = frame['FullTimeResult'].map(FT_RESULT_2_CODE) \
+			.fillna(FT_RESULT_UNKNOWN).to_numpy(dtype=np.int8)
+
+		date = pd.to_datetime(frame['MatchDate']) \
+			.to_numpy(dtype='datetime64[ns]').view(np.int64)
+
+		team_codes, teams = pd.factorize(
+			pd.concat([frame['HomeTeam'], frame['AwayTeam']]).fillna('')
+		)
+		league_codes, leagues = pd.factorize(frame['LeagueDivision'].fillna(''))
+
+		return cls(
+			odds=odds,
+			result=result,
+			date=np.ascontiguousarray(date),
+			home_team=team_codes[:num_matches].astype(np.int32),
+			away_team=team_codes[num_matches:].astype(np.int32),
+			league=league_codes.astype(np.int32),
+			teams=list(teams),
+			leagues=list(leagues),
+		)
+
+	@classmethod
+	def from_csv(
+		cls,
+		csv_path: str,
+		odds_columns: Tuple[str, str, str],
+		cache_dir: Optional[str] = MATCH_STORE_CACHE_DIR,
+	) -> 'MatchStore':
+		"""
+			Parses the csv, or opens its snapshot if the csv didn't change since it was taken.
+			Snapshots are keyed by csv path, mtime and size. cache_dir=None disables them.
+		"""
+		if cache_dir is None:
+			return cls.from_frame(pd.read_csv(csv_path), odds_columns)
+
+		csv_path = os.path.abspath(csv_path)
+		csv_stat = os.stat(csv_path)
+		path_key = hashlib.blake2b(csv_path.encode(), digest_size=8).hexdigest()
+		version_key = hashlib.blake2b(
+			repr((csv_stat.st_mtime_ns, csv_stat.st_size, tuple(odds_columns))).encode(),
+			digest_size=8,
+		).hexdigest()
+		snapshot_prefix = f"{os.path.basename(csv_path)}-{path_key}-"
+		snapshot_path = os.path.join(cache_dir, snapshot_prefix + version_key)
+
+		if os.path.exists(snapshot_path):
+			return cls.load(snapshot_path)
+
+		store = cls.from_frame(pd.read_csv(csv_path), odds_columns)
+
+		# snapshots of older versions of the csv are stale, other names are temp dirs of
+		# processes writing a snapshot right now
+		os.makedirs(cache_dir, exist_ok=True)
+		for name in os.listdir(cache_dir):
+			version = name[len(snapshot_prefix):]
+			if name.startswith(snapshot_prefix) and len(version) == len(version_key) and version != version_key:
+				shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+
+		tmp_path = tempfile.mkdtemp(dir=cache_dir, prefix='.tmp-')
+		store.save(tmp_path)
+		try:
+			os.replace(tmp_path, snapshot_path)
+		except OSError:
+			# another process wrote the snapshot first
+			shutil.rmtree(tmp_path, ignore_errors=True)
+			if not os.path.exists(snapshot_path):
+				raise
+		return cls.load(snapshot_path)
+
+	def save(self, path: str):
+		"""Writes the columns as .npy files in the `path` directory."""
+		os.makedirs(path, exist_ok=True)
+		for column in self.ARRAY_COLUMNS:
+			np.save(os.path.join(path, column + '.npy'), getattr(self, column))
+		with open(os.path.join(path, 'categories.json'), 'w') as categories_file:
+			json.dump({'teams': self.teams, 'leagues': self.leagues}, categories_file)
+
+	@classmethod
+	def load(cls, path: str, mmap: bool = True) -> 'MatchStore':
+		"""Opens a store written by save(), with read only memory mapped columns by default."""
+		with open(os.path.join(path, 'categories.json')) as categories_file:
+			categories = json.load(categories_file)
+
+		mmap_mode = 'r' if mmap else None
+		return cls(
+			**{
+				column: np.load(os.path.join(path, column + '.npy'), mmap_mode=mmap_mode)
+				for column in cls.ARRAY_COLUMNS
+			},
+			teams=categories['teams'],
+			leagues=categories['leagues'],
+		)
+
+	def __len__(self) -> int:
+		return self.result.shape[0]
+
+	def __getitem__(self, rows) -> 'MatchStore':
+		odds = self.odds[rows]
+		if not isinstance(rows, slice):
+			odds = np.asfortranarray(odds)
+
+		return MatchStore(
+			odds=odds,
+			result=self.result[rows],
+			date=self.date[rows],
+			home_team=self.home_team[rows],
+			away_team=self.away_team[rows],
+			league=self.league[rows],
+			teams=self.teams,
+			leagues=self.leagues,
+		)
+
+	def __repr__(self):
+		return f"MatchStore({len(self)} matches)"
+
+	@property
+	def home_odds(self) -> np.ndarray:
+		return self.odds[:, 0]
+
+	@property
+	def draw_odds(self) -> np.ndarray:
+		return self.odds[:, 1]
+
+	@property
+	def away_odds(self) -> np.ndarray:
+		return self.odds[:, 2]
+
+	def dates(self) -> np.ndarray:
+		return self.date.view('datetime64[ns]')
+
+	def valid(self) -> np.ndarray:
+		"""Mask of the matches we can bet on: all 1/X/2 odds known and at least 1."""
+		if self._valid is None:
+			self._valid = np.all(self.odds[:, :3] >= 1.0, axis=1)
+		return self._valid
+
+	def result_bits(self) -> np.ndarray:
+		"""Results as settlement bitmasks (see settlement.RESULT_BITS), computed once."""
+		if self._result_bits is None:
+			self._result_bits = settlement.result_bits(self.result)
+		return self._result_bits
+
+	def _category_index(self, column: str) -> Tuple[Dict[str, int], np.ndarray, np.ndarray]:
+		"""
+			(name -> code, rows sorted by code then row, start of every code in those rows)
+			for a categorical column, built on first use.
+		"""
+		if column not in self._indexes:
+			categories = self.leagues if column == 'league' else self.teams
+			codes = getattr(self, column)
+			rows = np.argsort(codes, kind='stable')
+			starts = np.searchsorted(codes[rows], np.arange(len(categories) + 1))
+			self._indexes[column] = ({name: code for code, name in enumerate(categories)}, rows, starts)
+		return self._indexes[column]
+
+	def _date_index(self) -> Tuple[np.ndarray, np.ndarray]:
+		"""(rows sorted by date, their dates), built on first use."""
+		if 'date' not in self._indexes:
+			rows = np.argsort(self.date, kind='stable')
+			self._indexes['date'] = (rows, self.date[rows])
+		return self._indexes['date']
+
+	def rows_where(self, column: str, value) -> np.ndarray:
+		"""
+			Sorted rows matching a predicate, without scanning the store:
+				league, home_team, away_team, team (home or away): a name, or a list/set of
+					names for membership
+				date: a date, or a (start, end) tuple for the inclusive range, either end
+					being None for an open range
+		"""
+		if column == 'date':
+			start, end = value if isinstance(value, tuple) else (value, value)
+			rows, dates = self._date_index()
+			low = 0 if start is None else np.searchsorted(dates, pd.Timestamp(start).value, side='left')
+			high = len(dates) if end is None else np.searchsorted(dates, pd.Timestamp(end).value, side='right')
+			return np.sort(rows[low:high])
+
+		if column == 'team':
+			return np.union1d(self.rows_where('home_team', value), self.rows_where('away_team', value))
+
+		if column not in ('league', 'home_team', 'away_team'):
+			raise ValueError(f"Can't filter matches on: {column}")
+
+		name2code, rows, starts = self._category_index(column)
+		names = value if isinstance(value, (list, set, frozenset)) else [value]
+		codes = [name2code[name] for name in names if name in name2code]
+		return np.sort(np.concatenate(
+			[np.zeros(0, dtype=rows.dtype)] + [rows[starts[code]:starts[code + 1]] for code in codes]
+		))
+
+	def query(self, predicates: List[Tuple[str, object]]) -> np.ndarray:
+		"""Sorted rows matching all the (column, value) predicates, see rows_where."""
+		matching = None
+		for column, value in predicates:
+			rows = self.rows_where(column, value)
+			matching = rows if matching is None else np.intersect1d(matching, rows, assume_unique=True)
+		return np.arange(len(self)) if matching is None else matching
+
+	def select(self, predicates: List[Tuple[str, object]]) -> 'MatchStore':
+		return self[self.query(predicates)]
+
+	def fingerprint(self) -> str:
+		"""Hash of the store contents, to key caches of anything derived from them."""
+		if self._fingerprint is None:
+			digest = hashlib.blake2b(digest_size=16)
+			for column in (self.odds, self.result, self.date, self.home_team, self.away_team, self.league):
+				digest.update(np.ascontiguousarray(column).tobytes())
+			digest.update(repr((self.teams, self.leagues)).encode())
+			self._fingerprint = digest.hexdigest()
+		return self._fingerprint
+
+	def iter_bet_odds(self, start: int = 0, stop: Optional[int] = None) -> Iterator[BetOdds]:
+		"""Yields the BetOdds of the valid matches in [start, stop), ids are store positions."""
+		stop = len(self) if stop is None else min(stop, len(self))
+		valid = self.valid()
+
+		for chunk_start in range(start, stop, self.ITER_CHUNK):
+			chunk_stop = min(chunk_start + self.ITER_CHUNK, stop)
+			rows = slice(chunk_start, chunk_stop)
+
+			prices = np.ascontiguousarray(self.odds[rows]).tolist()
+			home_team = self.home_team[rows].tolist()
+			away_team = self.away_team[rows].tolist()
+			league = self.league[rows].tolist()
+			dates = self.dates()[rows]
+
+			for idx in np.flatnonzero(valid[rows]).tolist():
+				yield BetOdds.from_prices(
+					id = chunk_start + idx,
+					teams = (self.teams[home_team[idx]], self.teams[away_team[idx]]),
+					prices = prices[idx],
+					competition = self.leagues[league[idx]],
+					eliminatory = 0,
+					date = dates[idx],
+				)
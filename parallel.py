@@ -0,0 +1,46 @@
+"""
+	Process pool helper for the embarrassingly parallel parts of the simulation.
+
+	Tasks are run in workers forked from the current process, so everything a task references
+	(agencies and their match stores, strategies) is inherited copy-on-write instead of being
+	pickled. Only the task index goes to the worker and only the task result comes back.
+"""
+
+import os
+import multiprocessing as mp
+
+from typing import Callable, List, Optional, TypeVar
+
+T = TypeVar('T')
+
+_FORKED_TASK = None
+
+
+def _run_forked_task(idx: int):
+	return _FORKED_TASK(idx)
+
+
+def resolve_num_workers(num_workers: Optional[int]) -> int:
+	"""None means one worker per core."""
+	if num_workers is None:
+		return os.cpu_count() or 1
+	return max(1, num_workers)
+
+
+def fork_map(task: Callable[[int], T], num_tasks: int, num_workers: Optional[int]) -> List[T]:
+	"""
+		Returns [task(0), ..., task(num_tasks - 1)], computed on up to num_workers processes.
+		Runs serially with one worker or on platforms without fork.
+	"""
+	global _FORKED_TASK
+
+	num_workers = min(resolve_num_workers(num_workers), num_tasks)
+	if num_workers <= 1 or 'fork' not in mp.get_all_start_methods():
+		return [task(idx) for idx in range(num_tasks)]
+
+	_FORKED_TASK = task
+	try:
+		with mp.get_context('fork').Pool(num_workers) as pool:
+			return pool.map(_run_forked_task, range(num_tasks), chunksize=1)
+	finally:
+		_FORKED_TASK = None
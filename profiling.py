@@ -0,0 +1,91 @@
+"""
+	Opt-in instrumentation of Simulation: cumulative time and number of calls per
+	(stage, strategy class), where the stages of a match played step by step are
+		odds_fetch: getting the next BetOdds from the agency
+		bet: strategy.bet
+		evaluate: agency.evaluate
+		stats_update: stats.update (and collecting what the strategy reports)
+	and a strategy played with bet_vectorized (play_vectorized) is a single `vectorized`
+	(`kernel`) call, a StrategyBatch a single `batch` call, and a strategy played in
+	matchday mode one `matchday` call per day.
+
+	When profiling is off the simulation only pays for `timer is None` checks.
+"""
+
+import json
+import time
+import cProfile
+import pstats
+import pandas as pd
+
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, Iterator, Optional
+
+# strategy class of the odds fetched once for all the strategies (single pass mode)
+ALL_STRATEGIES = "*"
+
+
+class StageTimer(object):
+	def __init__(self):
+		self.seconds = defaultdict(float)
+		self.calls = defaultdict(int)
+		self.matches = defaultdict(int)
+
+	def add(self, stage: str, strategy_class: str, seconds: float, calls: int = 1, matches: int = 1):
+		key = (stage, strategy_class)
+		self.seconds[key] += seconds
+		self.calls[key] += calls
+		self.matches[key] += matches
+
+	def lap(self, stage: str, strategy, start: float) -> float:
+		"""Adds the time since start to the stage and returns the current time."""
+		now = time.perf_counter()
+		self.add(stage, type(strategy).__name__, now - start)
+		return now
+
+	def timed_iter(self, items: Iterable, strategy_class: str, stage: str = "odds_fetch") -> Iterator:
+		"""Yields the items, adding the time spent getting each one to the stage."""
+		iterator = iter(items)
+		while True:
+			start = time.perf_counter()
+			try:
+				item = next(iterator)
+			except StopIteration:
+				return
+			self.add(stage, strategy_class, time.perf_counter() - start)
+			yield item
+
+	def merge(self, other: 'StageTimer'):
+		for key in other.seconds:
+			self.add(*key, other.seconds[key], other.calls[key], other.matches[key])
+
+	def to_df(self) -> pd.DataFrame:
+		rows = [
+			{
+				"stage": stage,
+				"strategy_class": strategy_class,
+				"seconds": self.seconds[(stage, strategy_class)],
+				"calls": self.calls[(stage, strategy_class)],
+				"matches": self.matches[(stage, strategy_class)],
+			}
+			for stage, strategy_class in self.seconds
+		]
+		frame = pd.DataFrame(rows, columns=["stage", "strategy_class", "seconds", "calls", "matches"])
+		frame["us_per_call"] = 1e6 * frame.seconds / frame.calls.clip(lower=1)
+		frame["share"] = frame.seconds / frame.seconds.sum() if len(frame) else frame.seconds
+		return frame.sort_values("seconds", ascending=False, ignore_index=True)
+
+	def to_json(self, path: Optional[str] = None) -> str:
+		timings = json.dumps(self.to_df().to_dict(orient="records"), indent=2)
+		if path is not None:
+			with open(path, 'w') as json_file:
+				json_file.write(timings)
+		return timings
+
+
+def dump_profile(run: Callable[[], object], path: str) -> pstats.Stats:
+	"""Runs `run` under cProfile, saves the profile to path (for snakeviz, pstats, ...)."""
+	profile = cProfile.Profile()
+	profile.runcall(run)
+	profile.dump_stats(path)
+	return pstats.Stats(path)
@@ -0,0 +1,190 @@
+"""
+	Persistent cache of simulation results, for re-running the same (agency, strategy,
+	config) combinations without simulating them again.
+
+	An entry holds the statistics of a strategy (of every variant of a StrategyBatch) on
+	the matches of one agency, and the strategy state at the end of the run. It is keyed by
+		* the fingerprint of the played matches (MatchStore.fingerprint)
+		* the strategy class and the source of the modules defining it and its bases, plus
+		  the source of the simulation engine as a whole (ENGINE_MODULES: the simulation
+		  loops, the agencies and match store feeding them, the odds and bet records, the
+		  settlement, the strategy interface, config, batch, kernels, odds buckets,
+		  allocators and statistics)
+		* every field of the BettingStrategyConfig and the rest of the strategy state
+		  (tag, decay, thresholds, calibration tables, ...)
+		* the kind of statistics kept (keep_history), the simulation mode and, in MATCHDAY
+		  mode, the allocator class and fields
+	so editing a strategy, its config or the data makes a new entry, and the old one ages
+	out: past max_bytes on disk, the least recently used entries (oldest mtime, refreshed
+	on every hit) are deleted.
+"""
+
+import os
+import sys
+import pickle
+import inspect
+import hashlib
+import importlib.util
+
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from match_store import MatchStore
+
+RESULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'results')
+
+# modules whose code changes the results of every strategy, hashed together whether
+# or not they are imported yet
+ENGINE_MODULES = (
+	'simulation',
+	'betting_agency',
+	'match_store',
+	'bet_details',
+	'settlement',
+	'strategy.interface',
+	'strategy.config',
+	'strategy.batch',
+	'strategy.kernels',
+	'strategy.odds_buckets',
+	'strategy.allocation',
+	'strategy.stats',
+)
+
+
+@lru_cache(maxsize=None)
+def source_version(module_name: str) -> str:
+	"""
+		Hash of the source of a module, read from its file when it isn't imported. Empty
+		if it can't be read (e.g. defined in __main__).
+	"""
+	try:
+		if module_name in sys.modules:
+			source = inspect.getsource(sys.modules[module_name])
+		else:
+			with open(importlib.util.find_spec(module_name).origin) as module_file:
+				source = module_file.read()
+	except (AttributeError, ImportError, OSError, TypeError, ValueError):
+		return ""
+	return hashlib.blake2b(source.encode(), digest_size=8).hexdigest()
+
+
+@lru_cache(maxsize=None)
+def engine_version() -> str:
+	"""Hash of the source of all the ENGINE_MODULES."""
+	digest = hashlib.blake2b(digest_size=8)
+	for module in ENGINE_MODULES:
+		digest.update(f"{module}:{source_version(module)},".encode())
+	return digest.hexdigest()
+
+
+def strategy_version(strategy_cls: type) -> str:
+	modules = [cls.__module__ for cls in strategy_cls.__mro__ if cls is not object]
+	versions = [f"{module}:{source_version(module)}" for module in dict.fromkeys(modules)]
+	return ",".join(versions + [f"engine:{engine_version()}"])
+
+
+class ResultCache(object):
+	def __init__(self, cache_dir: str = RESULT_CACHE_DIR, max_bytes: int = 1 << 30):
+		self.cache_dir = cache_dir
+		self.max_bytes = max_bytes
+
+	def key(
+		self,
+		store: MatchStore,
+		strategies: List[object],
+		keep_history: bool,
+		mode: str,
+		allocator: Optional[object] = None,
+	) -> str:
+		"""
+			Key of the results of `strategies` (one strategy, or the variants of a batch) on
+			the matches of store, from their current state, played in the simulation mode
+			with the stakes split by allocator (None: the amounts the strategies ask for).
+		"""
+		strategy_cls = type(strategies[0])
+		digest = hashlib.blake2b(digest_size=16)
+		digest.update(f"{strategy_cls.__module__}.{strategy_cls.__qualname__}".encode())
+		digest.update(strategy_version(strategy_cls).encode())
+		digest.update(f"{keep_history}-{mode}".encode())
+		if allocator is not None:
+			allocator_cls = type(allocator)
+			digest.update(f"{allocator_cls.__module__}.{allocator_cls.__qualname__}".encode())
+			digest.update(strategy_version(allocator_cls).encode())
+			digest.update(pickle.dumps(sorted(vars(allocator).items()), protocol=4))
+		for strategy in strategies:
+			state = {name: value for name, value in vars(strategy).items() if name != 'config'}
+			config = sorted(vars(strategy.config).items())
+			digest.update(pickle.dumps((type(strategy.config).__qualname__, config, state), protocol=4))
+		return f"{store.fingerprint()}-{strategy_cls.__name__}-{digest.hexdigest()}"
+
+	def _path(self, key: str) -> str:
+		return os.path.join(self.cache_dir, key + '.pkl')
+
+	def get(self, key: str) -> Optional[Tuple[List[object], List[Dict]]]:
+		"""(statistics, end state of every strategy) stored under key, None on a miss."""
+		path = self._path(key)
+		try:
+			with open(path, 'rb') as cache_file:
+				entry = pickle.load(cache_file)
+			os.utime(path)
+		except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+			return None
+		return entry
+
+	def put(self, key: str, stats: List[object], states: List[Dict]):
+		os.makedirs(self.cache_dir, exist_ok=True)
+		path = self._path(key)
+		with open(path + f'.{os.getpid()}.tmp', 'wb') as cache_file:
+			pickle.dump((stats, states), cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+		os.replace(path + f'.{os.getpid()}.tmp', path)
+		self.evict()
+
+	def entries(self) -> List[Tuple[str, float, int]]:
+		"""(key, mtime, size) of the stored entries, least recently used first."""
+		if not os.path.isdir(self.cache_dir):
+			return []
+		entries = []
+		for name in os.listdir(self.cache_dir):
+			if not name.endswith('.pkl'):
+				continue
+			try:
+				entry_stat = os.stat(os.path.join(self.cache_dir, name))
+			except FileNotFoundError:
+				continue
+			entries.append((name[:-len('.pkl')], entry_stat.st_mtime, entry_stat.st_size))
+		return sorted(entries, key=lambda entry: entry[1])
+
+	def size(self) -> int:
+		return sum(size for _, _, size in self.entries())
+
+	def evict(self):
+		"""Deletes the least recently used entries until the cache fits in max_bytes."""
+		entries = self.entries()
+		total = sum(size for _, _, size in entries)
+		for key, _, size in entries:
+			if total <= self.max_bytes:
+				break
+			self._remove(key)
+			total -= size
+
+	def _remove(self, key: str):
+		try:
+			os.remove(self._path(key))
+		except FileNotFoundError:
+			pass
+
+	def invalidate(self, store: Optional[MatchStore] = None, strategy_cls: Optional[type] = None) -> int:
+		"""
+			Deletes the entries of a store, of a strategy class, of both, or all of them
+			without arguments. Returns the number of entries deleted.
+		"""
+		removed = 0
+		for key, _, _ in self.entries():
+			fingerprint, cls_name, _ = key.split('-')
+			if store is not None and fingerprint != store.fingerprint():
+				continue
+			if strategy_cls is not None and cls_name != strategy_cls.__name__:
+				continue
+			self._remove(key)
+			removed += 1
+		return removed
@@ -0,0 +1,84 @@
+"""
+	Saving and loading of Simulation.stats_to_df() frames.
+
+	A sweep is saved in a directory:
+		scalars.parquet: the scalar columns (scalars.pkl when pyarrow isn't installed),
+			start_date as datetime64, NaT for the strategies that never bet
+		<column>.npy: the trajectories of all the strategies for an array column, concatenated
+		<column>.offsets.npy: the trajectory of row i is <column>[offsets[i]:offsets[i + 1]]
+		columns.json: the column order and which columns are trajectories
+
+	Trajectories are loaded memory mapped, every row being a view of the column file, so
+	reopening a sweep doesn't read the trajectories until they are used.
+"""
+
+import os
+import json
+import numpy as np
+import pandas as pd
+
+from typing import List
+
+try:
+	import pyarrow
+	HAVE_PARQUET = True
+except ImportError:
+	HAVE_PARQUET = False
+
+
+def trajectory_columns(stats: pd.DataFrame) -> List[str]:
+	return [
+		column for column in stats.columns
+		if stats.shape[0] and all(isinstance(value, np.ndarray) for value in stats[column])
+	]
+
+
+def save_results(stats: pd.DataFrame, path: str):
+	os.makedirs(path, exist_ok=True)
+	trajectories = trajectory_columns(stats)
+
+	scalars = stats.drop(columns=trajectories)
+	if 'start_date' in scalars.columns:
+		# strategies that never bet have an empty start date
+		scalars['start_date'] = pd.to_datetime(scalars['start_date'].replace('', pd.NaT), errors='coerce')
+
+	# load_results prefers parquet, so a stale file of the other format would shadow this one
+	scalars_file, stale_file = ('scalars.parquet', 'scalars.pkl') if HAVE_PARQUET else ('scalars.pkl', 'scalars.parquet')
+	if os.path.exists(os.path.join(path, stale_file)):
+		os.remove(os.path.join(path, stale_file))
+	if HAVE_PARQUET:
+		scalars.to_parquet(os.path.join(path, scalars_file))
+	else:
+		scalars.to_pickle(os.path.join(path, scalars_file))
+
+	for column in trajectories:
+		values = list(stats[column])
+		offsets = np.zeros(len(values) + 1, dtype=np.int64)
+		np.cumsum([len(value) for value in values], out=offsets[1:])
+		np.save(os.path.join(path, column + '.npy'), np.concatenate(values))
+		np.save(os.path.join(path, column + '.offsets.npy'), offsets)
+
+	with open(os.path.join(path, 'columns.json'), 'w') as columns_file:
+		json.dump({'columns': list(stats.columns), 'trajectories': trajectories}, columns_file)
+
+
+def load_results(path: str, mmap: bool = True) -> pd.DataFrame:
+	with open(os.path.join(path, 'columns.json')) as columns_file:
+		columns = json.load(columns_file)
+
+	if os.path.exists(os.path.join(path, 'scalars.parquet')):
+		stats = pd.read_parquet(os.path.join(path, 'scalars.parquet'))
+	else:
+		stats = pd.read_pickle(os.path.join(path, 'scalars.pkl'))
+
+	mmap_mode = 'r' if mmap else None
+	for column in columns['trajectories']:
+		values = np.load(os.path.join(path, column + '.npy'), mmap_mode=mmap_mode)
+		offsets = np.load(os.path.join(path, column + '.offsets.npy'))
+		stats[column] = pd.Series(
+			[values[start:stop] for start, stop in zip(offsets[:-1], offsets[1:])],
+			index=stats.index,
+			dtype=object,
+		)
+
+	return stats[columns['columns']]
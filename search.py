@@ -0,0 +1,132 @@
+"""
+	Successive halving over strategy configs, with matches as the budget.
+
+	All the candidates play the first min_matches matches. Candidates out of money are
+	dropped, the best 1/eta of the rest (by profit, drawdown, ...) go on to play the next
+	matches up to eta times the budget, and so on until the survivors played the whole
+	history. Strategies resume from their state at the end of the previous round, so every
+	match is played at most once per candidate.
+"""
+
+import math
+import pandas as pd
+
+from typing import Callable, List, Optional, Union
+
+from betting_agency import BettingAgency, StoreAgency
+from simulation import Simulation
+from strategy.batch import StrategyBatch
+from strategy.interface import BettingStrategy
+
+Candidate = Union[BettingStrategy, StrategyBatch]
+
+# metric -> whether higher is better
+METRICS = {
+	"profit": True,
+	"profit_per_bet": True,
+	"max_drawdown": False,
+	"longest_losing_streak": False,
+}
+
+
+class SuccessiveHalving(object):
+	def __init__(
+		self,
+		agency: BettingAgency,
+		candidates: List[Candidate],
+		min_matches: int = 1000,
+		eta: int = 3,
+		metric: Union[str, Callable[[object], float]] = "profit",
+		num_workers: Optional[int] = 1,
+		**simulation_args,
+	):
+		"""
+			candidates: strategies and StrategyBatch, whose variants are ranked one by one.
+			metric: one of METRICS, or a function of the statistics of a candidate, higher
+				being better.
+			num_workers, simulation_args: passed to the Simulation playing every round.
+		"""
+		if min_matches < 1:
+			raise ValueError(f"min_matches should be at least 1, given: {min_matches}")
+		if eta < 2:
+			raise ValueError(f"eta should be at least 2, given: {eta}")
+		if isinstance(metric, str) and metric not in METRICS:
+			raise ValueError(f"Unknown metric: {metric}, should be one of {list(METRICS)}")
+
+		self.agency = agency
+		self.candidates = candidates
+		self.min_matches = min_matches
+		self.eta = eta
+		self.metric = metric
+		self.num_workers = num_workers
+		self.simulation_args = simulation_args
+
+		self.simulation = None
+		self.matches_played = {}
+
+	def score(self, stats) -> float:
+		if callable(self.metric):
+			return self.metric(stats)
+		stats.compute_stats()
+		value = getattr(stats, self.metric)
+		return value if METRICS[self.metric] else -value
+
+	def _survivors(self, candidates: List[Candidate], names: List[str]) -> List[Candidate]:
+		names = set(names)
+		survivors = []
+		for candidate in candidates:
+			if isinstance(candidate, StrategyBatch):
+				batch = candidate.subset(names)
+				if len(batch):
+					survivors.append(batch)
+			elif str(candidate) in names:
+				survivors.append(candidate)
+		return survivors
+
+	def run(self) -> pd.DataFrame:
+		"""
+			The stats_to_df() leaderboard of all the candidates, with the number of matches
+			each one got to play (`budget`), best first: the ones out of money last, then by
+			budget and score.
+		"""
+		store = self.agency.matches()
+		self.simulation = Simulation([], self.candidates, num_workers=self.num_workers, **self.simulation_args)
+		self.simulation.progress = False
+
+		candidates = list(self.candidates)
+		start, budget = 0, min(self.min_matches, len(store))
+		while candidates:
+			self.simulation.agencies = [StoreAgency(store[start:budget], str(self.agency))]
+			self.simulation.strategies = candidates
+			self.simulation.simulate()
+
+			names = [name for candidate in candidates for name in Simulation.stats_names(candidate)]
+			for name in names:
+				self.matches_played[name] = budget
+			if budget >= len(store):
+				break
+
+			scores = {}
+			for name in names:
+				stats = self.simulation.strategy2statistics[(str(self.agency), name)]
+				if not stats.out_of_money():
+					scores[name] = self.score(stats)
+			ranked = sorted(scores, key=lambda name: scores[name], reverse=True)
+			candidates = self._survivors(candidates, ranked[:math.ceil(len(ranked) / self.eta)])
+			start, budget = budget, min(len(store), budget * self.eta)
+
+		return self.leaderboard()
+
+	def leaderboard(self) -> pd.DataFrame:
+		stats = self.simulation.stats_to_df()
+		stats["budget"] = stats.strategy.map(self.matches_played)
+		scores = {
+			name: self.score(self.simulation.strategy2statistics[(str(self.agency), name)])
+			for name in stats.strategy
+		}
+		stats["score"] = stats.strategy.map(scores)
+		return stats.sort_values(
+			by=["is_out_of_money", "budget", "score"],
+			ascending=[True, False, False],
+			ignore_index=True,
+		)
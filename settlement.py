@@ -0,0 +1,82 @@
+"""
+	Batch settlement of placed bets against the full time results of a match store.
+
+	Results and selections are compared as bitmasks: every full time result sets one bit
+	and every selection is the union of the results it wins on, so the combined selections
+	(1X, X2) are settled by the same single `&` as the simple ones.
+"""
+
+import numpy as np
+
+from typing import Tuple
+
+from bet_details import NO_BET_CODE
+
+
+# indexed by full time result code, the last entry catches FT_RESULT_UNKNOWN (-1)
+RESULT_BITS = np.array([
+	0b001, # H
+	0b010, # D
+	0b100, # A
+	0b000, # unknown, never wins
+], dtype=np.uint8)
+
+# indexed by selection code, see bet_details.SELECTION_CODES
+SELECTION_MASKS = np.array([
+	0b001, # 1
+	0b010, # X
+	0b100, # 2
+	0b011, # 1X
+	0b110, # X2
+], dtype=np.uint8)
+
+
+def result_bits(result_codes: np.ndarray) -> np.ndarray:
+	return RESULT_BITS[result_codes]
+
+
+def selection_hits(match_result_bits: np.ndarray) -> np.ndarray:
+	"""(matches, 5) mask of the selection codes winning every match."""
+	return (SELECTION_MASKS & match_result_bits.reshape(-1, 1)) != 0
+
+
+def settle(
+	match_result_bits: np.ndarray,
+	match_idx: np.ndarray,
+	selection: np.ndarray,
+	amount: np.ndarray,
+	odds: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+	"""
+		Settles a batch of bets in one pass. Bet i is `amount[i]` placed on selection code
+		`selection[i]` of match `match_idx[i]` at `odds[i]`.
+		Returns the (spent, won) amount of every bet.
+	"""
+	amount = np.asarray(amount, dtype=np.float64)
+	hit = (SELECTION_MASKS[selection] & match_result_bits[match_idx]) != 0
+	won = np.where(hit, amount * odds, 0.0)
+	return amount, won
+
+
+def settle_picks(
+	odds: np.ndarray,
+	hits: np.ndarray,
+	selections: np.ndarray,
+	amounts: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+	"""
+		Settles the bets of a strategy over a run of matches in one go, odds and hits being
+		the (matches, 5) odds and selection_hits of the matches. selections and amounts are
+		(matches, bets per match) as returned by bet_vectorized, NO_BET_CODE where no bet is
+		placed, optionally with a leading axis for the variants of a batch.
+		Returns the mask of the placed bets, the odds of every bet and the spent and won
+		amount per match.
+	"""
+	placed = (selections != NO_BET_CODE)
+	picked = np.where(placed, selections, 0)
+	match_idx = np.arange(odds.shape[0]).reshape(-1, 1)
+	selection_odds = odds[match_idx, picked]
+
+	spent = np.where(placed, amounts, 0.0)
+	won = np.where(hits[match_idx, picked], spent * selection_odds, 0.0)
+	return placed, selection_odds, spent.sum(axis=-1), won.sum(axis=-1)
@@ -1,78 +1,587 @@
+import time
 import numpy as np
 import pandas as pd
 
 from collections import defaultdict
-from typing import List
+from typing import List, Optional, Union
 from tqdm import tqdm
 
+import settlement
+from bet_details import BetOdds, NO_BET_CODE
 from betting_agency import BettingAgency, Bet365
+from checkpoint import Checkpoint
+from match_store import MatchStore
+from parallel import fork_map, resolve_num_workers
+from profiling import StageTimer, ALL_STRATEGIES, dump_profile
+from result_cache import ResultCache
 from strategy.interface import BettingStrategy
-from strategy.stats import StrategyStatistics
+from strategy.batch import StrategyBatch
+from strategy.stats import StrategyStatistics, SummaryStatistics, OUT_OF_MONEY_BALANCE
+from strategy.allocation import Allocator
 
 
 class Simulation(object):
+	SEQUENTIAL = "sequential"
+	SINGLE_PASS = "single_pass"
+	MATCHDAY = "matchday"
+	# outputs of a batch chunk are (variants x matches) arrays of at most that many values
+	BATCH_CHUNK_VALUES = 1 << 22
+
 	def __init__(
 		self,
 		agencies: List[BettingAgency],
-		strategies: List[BettingStrategy]
+		strategies: List[Union[BettingStrategy, StrategyBatch]],
+		num_workers: Optional[int] = 1,
+		mode: str = SEQUENTIAL,
+		vectorized: bool = True,
+		keep_history: bool = True,
+		profile: bool = False,
+		kernels: bool = True,
+		cache: Optional[ResultCache] = None,
+		allocator: Optional[Allocator] = None,
 	):
+		"""
+			strategies: strategies, or StrategyBatch of variants of a strategy, reported under
+				the name of every variant and simulated together.
+			num_workers: processes to shard the strategies over, None for one per core.
+				Every worker plays all the agencies for its strategies, in order, so the
+				statistics are exactly the ones of a single process run.
+			mode: SEQUENTIAL plays the odds stream of an agency once per strategy,
+				SINGLE_PASS walks it once and hands every odds to all the strategies that
+				still have money. MATCHDAY groups the stream by date: strategies implementing
+				bet_matchday bet on all the fixtures of a day from the balance at its start,
+				the day is settled in one step and the statistics get one entry per matchday.
+				The other strategies are played match by match.
+			vectorized: play the strategies implementing bet_vectorized over the whole
+				stream at once instead of match by match.
+			keep_history: keep the per match trajectories in the statistics. Otherwise
+				SummaryStatistics only keep running aggregates and a downsampled balance
+				curve, with memory independent of the number of matches.
+			profile: time every stage of the simulation per strategy class, see timings().
+			kernels: play the strategies implementing play_vectorized (the Martingales) with
+				their compiled loop instead of match by match.
+			cache: where to look up the results of a strategy on an agency before playing
+				it, and to store them after. Only used for strategies starting fresh on the
+				agency (no statistics recorded under their name yet).
+			allocator: in MATCHDAY mode, splits the balance at the start of a day over the
+				picks of the strategies (see strategy.allocation) instead of staking the
+				amounts they ask for.
+		"""
+		if mode not in (self.SEQUENTIAL, self.SINGLE_PASS, self.MATCHDAY):
+			raise ValueError(f"Unknown simulation mode: {mode}")
+
 		self.agencies = agencies
 		self.strategies = strategies
+		self.num_workers = num_workers
+		self.mode = mode
+		self.vectorized = vectorized
+		self.keep_history = keep_history
+		self.kernels = kernels
+		self.cache = cache
+		self.allocator = allocator
 
-		self.strategy2statistics = defaultdict(lambda: StrategyStatistics())
+		self.strategy2statistics = defaultdict(
+			lambda: StrategyStatistics() if self.keep_history else SummaryStatistics()
+		)
 		self.verbose = False
+		self.progress = True
+		self.timer = StageTimer() if profile else None
 
 	def simulate(self):
+		num_workers = min(resolve_num_workers(self.num_workers), len(self.strategies))
+		if num_workers > 1 and self._can_shard():
+			self._simulate_sharded(num_workers)
+			return
+
+		self.simulate_strategies(self.strategies)
+
+	def checkpoint(self) -> Checkpoint:
+		"""Snapshot of the strategies and their statistics, after simulate()."""
+		return Checkpoint.take(self)
+
+	def resume(self, checkpoint: Checkpoint):
+		"""
+			Restores the snapshot and plays only the matches appended to the agencies since it
+			was taken, ending with the statistics of a simulation of the whole history.
+			Strategies out of money at the checkpoint stay out of money. In MATCHDAY mode the
+			checkpoint has to end on a whole matchday.
+		"""
+		appended = checkpoint.appended(self.agencies)
+		if self.mode == self.MATCHDAY:
+			for agency, new_matches in zip(self.agencies, appended):
+				played = checkpoint.num_matches[str(agency)]
+				if played and len(new_matches.store) and agency.store.date[played - 1] == new_matches.store.date[0]:
+					raise ValueError(f"The checkpoint of {agency} ends in the middle of a matchday")
+		checkpoint.restore(self)
+
+		agencies = self.agencies
+		self.agencies = appended
+		try:
+			self.simulate()
+		finally:
+			self.agencies = agencies
+
+	def simulate_strategies(self, strategies: List[Union[BettingStrategy, StrategyBatch]], progress: Optional[bool] = None):
+		batches = [strategy for strategy in strategies if isinstance(strategy, StrategyBatch)]
+		strategies = [strategy for strategy in strategies if not isinstance(strategy, StrategyBatch)]
 
 		for agency in self.agencies:
+			keys = {}
+			agency_batches, agency_strategies = batches, strategies
+			if self.cache is not None:
+				# one view, so the store is hashed once for all the strategies
+				matches = agency.matches()
+				keys = {id(strategy): self._cache_key(agency, matches, strategy) for strategy in batches + strategies}
+				agency_batches = [batch for batch in batches if not self._load_cached(agency, batch, keys[id(batch)])]
+				agency_strategies = [strategy for strategy in strategies if not self._load_cached(agency, strategy, keys[id(strategy)])]
+
+			if self.mode == self.MATCHDAY:
+				for strategy in agency_batches + agency_strategies:
+					for variant, name in zip(self.variants(strategy), self.stats_names(strategy)):
+						self.simulate_matchdays(agency, variant, progress, name=name)
+			elif self.mode == self.SINGLE_PASS:
+				for batch in agency_batches:
+					self.simulate_batch(agency, batch, progress)
+				self.simulate_single_pass(agency, agency_strategies, progress)
+			else:
+				for batch in agency_batches:
+					self.simulate_batch(agency, batch, progress)
+				for strategy in agency_strategies:
+					self.simulate_strategy(agency, strategy, progress)
+
+			for strategy in agency_batches + agency_strategies:
+				if keys.get(id(strategy)) is not None:
+					self._store_cached(agency, strategy, keys[id(strategy)])
+
+	@staticmethod
+	def stats_names(strategy: Union[BettingStrategy, StrategyBatch]) -> List[str]:
+		"""Names the statistics of a strategy are reported under."""
+		return strategy.names if isinstance(strategy, StrategyBatch) else [str(strategy)]
+
+	@staticmethod
+	def variants(strategy: Union[BettingStrategy, StrategyBatch]) -> List[BettingStrategy]:
+		"""The strategy objects played for a strategy, in the order of stats_names."""
+		return strategy.variants if isinstance(strategy, StrategyBatch) else [strategy]
+
+	def _cache_key(
+		self,
+		agency: BettingAgency,
+		matches: MatchStore,
+		strategy: Union[BettingStrategy, StrategyBatch],
+	) -> Optional[str]:
+		"""
+			matches: agency.matches().
+			None when the strategy already has statistics on the agency, to be continued.
+		"""
+		if any((str(agency), name) in self.strategy2statistics for name in self.stats_names(strategy)):
+			return None
+		allocator = self.allocator if self.mode == self.MATCHDAY else None
+		return self.cache.key(matches, self.variants(strategy), self.keep_history, self.mode, allocator)
+
+	def _load_cached(self, agency: BettingAgency, strategy: Union[BettingStrategy, StrategyBatch], key: Optional[str]) -> bool:
+		entry = None if key is None else self.cache.get(key)
+		if entry is None:
+			return False
+		stats, states = entry
+		for name, variant_stats in zip(self.stats_names(strategy), stats):
+			self.strategy2statistics[(str(agency), name)] = variant_stats
+		for variant, state in zip(self.variants(strategy), states):
+			variant.__dict__.update(state)
+		return True
+
+	def _store_cached(self, agency: BettingAgency, strategy: Union[BettingStrategy, StrategyBatch], key: str):
+		self.cache.put(
+			key,
+			[self.strategy2statistics[(str(agency), name)] for name in self.stats_names(strategy)],
+			[variant.__dict__ for variant in self.variants(strategy)],
+		)
+
+	def _can_shard(self) -> bool:
+		# strategies sharing a name also share their statistics, keep them in one process
+		names = [name for strategy in self.strategies for name in self.stats_names(strategy)]
+		return len(set(names)) == len(names)
+
+	def _simulate_sharded(self, num_workers: int):
+		shards = [self.strategies[idx::num_workers] for idx in range(num_workers)]
+
+		def simulate_shard(shard_idx):
+			# the forked timer holds the parent's timings, collect only the ones of this shard
+			if self.timer is not None:
+				self.timer = StageTimer()
+			self.simulate_strategies(shards[shard_idx], progress=False)
+			return [
+				(strategy, {
+					name: [self.strategy2statistics[(str(agency), name)] for agency in self.agencies]
+					for name in self.stats_names(strategy)
+				})
+				for strategy in shards[shard_idx]
+			], self.timer
+
+		results = {}
+		for shard, (shard_results, timer) in zip(shards, fork_map(simulate_shard, num_workers, num_workers)):
+			if timer is not None:
+				self.timer.merge(timer)
+			for strategy, (worker_strategy, agency_stats) in zip(shard, shard_results):
+				strategy.__dict__.update(worker_strategy.__dict__)
+				results[id(strategy)] = agency_stats
+
+		for agency_idx, agency in enumerate(self.agencies):
 			for strategy in self.strategies:
-				key = (str(agency), str(strategy))
-				stats = self.strategy2statistics[key]
-
-				for bet_odds in tqdm(agency.get_betting_oddset()):
-
-					if self.verbose:
-						print("=" * 100)
-						print("current balance: ", strategy.config.balance)
-						print(bet_odds)
-
-					if not stats.start_date:
-						stats.mark_first_date(bet_odds.date)
-
-					placed_bets, _ = strategy.bet(bet_odds)
-					spent, won = agency.evaluate(agency.csv, placed_bets)
-					strategy.config.balance += (won - spent)
-
-					if self.verbose:
-						print("PlacedBets: ", placed_bets)
-						print("Evaluated: ", spent, won)
-						print("Balance: ", strategy.config.balance)
-
-					argdict = {}
-					if hasattr(strategy, "sum_to_recover"):
-						argdict["sum_to_recover"] = strategy.sum_to_recover
-					if hasattr(strategy, "sum_to_recover_exponitially_decreased"):
-						argdict["sum_to_recover_exponitially_decreased"] = \
-							strategy.sum_to_recover_exponitially_decreased
-					if hasattr(strategy, "steps_on_red"):
-						argdict["steps_on_red"] = strategy.steps_on_red
-
-					stats.update(
-						spent, won,
-						strategy.state().balance,
-						odds_bet_on=[pb.bet_odds.odds[pb.selection] for pb in placed_bets],
-						bet_num=len(placed_bets),
-						**argdict,
-					)
-
-					if stats.out_of_money():
-						break
+				for name, agency_stats in results[id(strategy)].items():
+					self.strategy2statistics[(str(agency), name)] = agency_stats[agency_idx]
+
+	def simulate_strategy(
+		self,
+		agency: BettingAgency,
+		strategy: BettingStrategy,
+		progress: Optional[bool] = None,
+		name: Optional[str] = None,
+	) -> StrategyStatistics:
+		"""
+			name: what the statistics are reported under, str(strategy) by default.
+			A strategy already out of money on the agency (resumed) isn't played.
+		"""
+		stats = self.strategy2statistics[(str(agency), name or str(strategy))]
+		if stats.out_of_money():
+			return stats
+		if self.simulate_vectorized(agency, strategy, stats) or self.simulate_kernel(agency, strategy, stats):
+			return stats
+
+		stats.reserve(agency.limit())
+		progress = self.progress if progress is None else progress
+		for bet_odds in tqdm(self._odds_stream(agency, type(strategy).__name__), disable=not progress):
+			if self.step(agency, strategy, stats, bet_odds):
+				break
+
+		return stats
+
+	def _odds_stream(self, agency: BettingAgency, strategy_class: str):
+		if self.timer is None:
+			return agency.get_betting_oddset()
+		return self.timer.timed_iter(agency.get_betting_oddset(), strategy_class)
+
+	def profile_strategy(self, agency: BettingAgency, strategy: BettingStrategy, path: str):
+		"""Plays a single strategy under cProfile and dumps the profile to path, returns its pstats."""
+		return dump_profile(lambda: self.simulate_strategy(agency, strategy, progress=False), path)
+
+	def timings(self) -> pd.DataFrame:
+		"""Time and calls per (stage, strategy class), needs profile=True."""
+		if self.timer is None:
+			raise ValueError("Profiling is disabled, create the Simulation with profile=True")
+		return self.timer.to_df()
+
+	def simulate_batch(
+		self,
+		agency: BettingAgency,
+		batch: StrategyBatch,
+		progress: Optional[bool] = None,
+	):
+		"""
+			Advances all the variants of the batch together, BATCH_CHUNK_VALUES // len(batch)
+			matches at a time.
+			Variants that can't be batched are simulated one after the other, the ones already
+			out of money on the agency aren't played.
+		"""
+		stats = [self.strategy2statistics[(str(agency), name)] for name in batch.names]
+		if any(variant_stats.out_of_money() for variant_stats in stats):
+			batch = batch.subset([
+				name for name, variant_stats in zip(batch.names, stats) if not variant_stats.out_of_money()
+			])
+			stats = [self.strategy2statistics[(str(agency), name)] for name in batch.names]
+		if len(batch) == 0:
+			return
+
+		chunks = None
+		if self.kernels and self.vectorized and not self.verbose:
+			start = time.perf_counter()
+			matches = agency.matches()
+			match_idx = np.flatnonzero(matches.valid())
+			chunks = batch.play_batch(
+				matches.odds[match_idx],
+				settlement.selection_hits(matches.result_bits()[match_idx]),
+				max(1, self.BATCH_CHUNK_VALUES // max(1, len(batch))),
+			)
+
+		if chunks is None:
+			if self.mode == self.SINGLE_PASS:
+				self.simulate_single_pass(agency, batch.variants, progress, names=batch.names)
+			else:
+				for variant, name in zip(batch.variants, batch.names):
+					self.simulate_strategy(agency, variant, progress, name=name)
+			return
+
+		num_matches = 0
+		for updates in chunks:
+			for variant_stats, update in zip(stats, updates):
+				if update is None:
+					continue
+				if not variant_stats.start_date:
+					variant_stats.mark_first_date(matches.dates()[match_idx[0]])
+				variant_stats.update_many(**update)
+				num_matches += len(update['balances'])
+
+		if self.timer is not None:
+			self.timer.add("batch", batch.strategy_cls.__name__, time.perf_counter() - start, matches=num_matches)
+
+	def simulate_single_pass(
+		self,
+		agency: BettingAgency,
+		strategies: List[BettingStrategy],
+		progress: Optional[bool] = None,
+		names: Optional[List[str]] = None,
+	):
+		"""
+			Plays the odds stream once for all strategies, dropping the ones out of money.
+			names: what the statistics are reported under, str(strategy) by default.
+		"""
+		names = names or [str(strategy) for strategy in strategies]
+		active = []
+		for strategy, name in zip(strategies, names):
+			stats = self.strategy2statistics[(str(agency), name)]
+			if stats.out_of_money():
+				continue
+			if not (self.simulate_vectorized(agency, strategy, stats) or self.simulate_kernel(agency, strategy, stats)):
+				stats.reserve(agency.limit())
+				active.append((strategy, stats))
+
+		if not active:
+			return
+
+		progress = self.progress if progress is None else progress
+
+		for bet_odds in tqdm(self._odds_stream(agency, ALL_STRATEGIES), disable=not progress):
+			active = [
+				(strategy, stats) for strategy, stats in active
+				if not self.step(agency, strategy, stats, bet_odds)
+			]
+			if not active:
+				break
+
+	def simulate_vectorized(
+		self,
+		agency: BettingAgency,
+		strategy: BettingStrategy,
+		stats: StrategyStatistics,
+	) -> bool:
+		"""
+			Plays the whole stream at once for strategies implementing bet_vectorized: the
+			balance path is the running sum of the per match results, cut at the first match
+			leaving the strategy out of money. Returns False if the strategy has to be played
+			match by match.
+		"""
+		if not self.vectorized or self.verbose:
+			return False
+
+		start = time.perf_counter()
+		matches = agency.matches()
+		match_idx = np.flatnonzero(matches.valid())
+		odds = matches.odds[match_idx]
+
+		bets = strategy.bet_vectorized(odds)
+		if bets is None:
+			return False
+		if len(match_idx) == 0:
+			return True
+
+		placed, selection_odds, spent, won = agency.settle_vectorized(match_idx, odds, bets)
+
+		# prepend the balance so the sum runs left to right, exactly like the step by step path
+		balances = np.cumsum(np.concatenate(([strategy.config.balance], won - spent)))[1:]
+		out_of_money = np.flatnonzero(balances <= OUT_OF_MONEY_BALANCE)
+		played = out_of_money[0] + 1 if len(out_of_money) else len(balances)
+
+		if not stats.start_date:
+			stats.mark_first_date(matches.dates()[match_idx[0]])
+
+		stats.update_many(
+			spent[:played], won[:played],
+			balances[:played],
+			odds_bet_on=selection_odds[:played][placed[:played]],
+			bet_nums=placed[:played].sum(axis=1),
+		)
+		strategy.config.balance = balances[played - 1].item()
+
+		if self.timer is not None:
+			self.timer.add("vectorized", type(strategy).__name__, time.perf_counter() - start, matches=int(played))
+		return True
+
+	def simulate_matchdays(
+		self,
+		agency: BettingAgency,
+		strategy: BettingStrategy,
+		progress: Optional[bool] = None,
+		name: Optional[str] = None,
+	) -> StrategyStatistics:
+		"""
+			Plays the matches of a day at once: one bet_matchday call with all the fixtures,
+			stakes from the balance at the start of the day (sized by the allocator if any),
+			one settlement, one statistics entry. Stops after the day leaving the strategy
+			out of money. Strategies without bet_matchday are played with simulate_strategy.
+		"""
+		stats = self.strategy2statistics[(str(agency), name or str(strategy))]
+		matches = agency.matches()
+		match_idx = np.flatnonzero(matches.valid())
+		if len(match_idx) == 0 or stats.out_of_money():
+			return stats
+
+		start = time.perf_counter()
+		odds = matches.odds[match_idx]
+		dates = matches.date[match_idx]
+		day_starts = np.flatnonzero(np.concatenate(([True], dates[1:] != dates[:-1])))
+		day_ends = np.append(day_starts[1:], len(match_idx))
+
+		if strategy.bet_matchday(odds[:day_ends[0]]) is None:
+			return self.simulate_strategy(agency, strategy, progress, name=name)
+
+		hits = settlement.selection_hits(matches.result_bits()[match_idx])
+		balance = strategy.config.balance
+		spent, won, balances, bet_nums, odds_bet_on = [], [], [], [], []
+
+		progress = self.progress if progress is None else progress
+		for day_start, day_end in tqdm(zip(day_starts, day_ends), total=len(day_starts), disable=not progress):
+			day_odds = odds[day_start:day_end]
+			selections, amounts = strategy.bet_matchday(day_odds)
+			if self.allocator is not None:
+				placed = (selections != NO_BET_CODE)
+				picked = np.where(placed, selections, 0)
+				amounts = self.allocator.allocate(
+					np.take_along_axis(day_odds, picked, axis=1),
+					strategy.pick_probabilities(day_odds, picked),
+					placed, balance,
+				)
+				selections = np.where(placed & (amounts > 0), selections, NO_BET_CODE)
+
+			placed, selection_odds, day_spent, day_won = settlement.settle_picks(
+				day_odds, hits[day_start:day_end], selections, amounts,
+			)
+			spent.append(day_spent.sum())
+			won.append(day_won.sum())
+			balance += won[-1] - spent[-1]
+			balances.append(balance)
+			bet_nums.append(int(placed.sum()))
+			odds_bet_on.append(selection_odds[placed])
+
+			if balance <= OUT_OF_MONEY_BALANCE:
+				break
+
+		if not stats.start_date:
+			stats.mark_first_date(matches.dates()[match_idx[0]])
+		stats.update_many(
+			np.array(spent), np.array(won),
+			np.array(balances),
+			odds_bet_on=np.concatenate(odds_bet_on),
+			bet_nums=np.array(bet_nums),
+		)
+		strategy.config.balance = float(balance)
+
+		if self.timer is not None:
+			self.timer.add("matchday", type(strategy).__name__, time.perf_counter() - start, calls=len(balances), matches=int(day_ends[len(balances) - 1]))
+		return stats
+
+	def simulate_kernel(
+		self,
+		agency: BettingAgency,
+		strategy: BettingStrategy,
+		stats: StrategyStatistics,
+	) -> bool:
+		"""
+			Plays the whole stream with the compiled loop of strategies implementing
+			play_vectorized. Returns False if the strategy has to be played match by match.
+		"""
+		if not self.kernels or self.verbose:
+			return False
+
+		start = time.perf_counter()
+		matches = agency.matches()
+		match_idx = np.flatnonzero(matches.valid())
+
+		played = strategy.play_vectorized(
+			matches.odds[match_idx],
+			settlement.selection_hits(matches.result_bits()[match_idx]),
+		)
+		if played is None:
+			return False
+		if len(played['balances']) == 0:
+			return True
+
+		if not stats.start_date:
+			stats.mark_first_date(matches.dates()[match_idx[0]])
+
+		stats.update_many(
+			played['spent'], played['won'],
+			played['balances'],
+			odds_bet_on=played['odds_bet_on'],
+			bet_nums=played['bet_nums'],
+			**played['other'],
+		)
+
+		if self.timer is not None:
+			self.timer.add("kernel", type(strategy).__name__, time.perf_counter() - start, matches=len(played['balances']))
+		return True
+
+	def step(
+		self,
+		agency: BettingAgency,
+		strategy: BettingStrategy,
+		stats: StrategyStatistics,
+		bet_odds: BetOdds,
+	) -> bool:
+		"""Bets on a single match and settles it. Returns whether the strategy is out of money."""
+		if self.verbose:
+			print("=" * 100)
+			print("current balance: ", strategy.config.balance)
+			print(bet_odds)
+
+		if not stats.start_date:
+			stats.mark_first_date(bet_odds.date)
+
+		timer = self.timer
+		if timer is not None:
+			start = time.perf_counter()
+
+		placed_bets, _ = strategy.bet(bet_odds)
+		if timer is not None:
+			start = timer.lap("bet", strategy, start)
+
+		spent, won = agency.evaluate(placed_bets)
+		if timer is not None:
+			start = timer.lap("evaluate", strategy, start)
+		strategy.config.balance += (won - spent)
+
+		if self.verbose:
+			print("PlacedBets: ", placed_bets)
+			print("Evaluated: ", spent, won)
+			print("Balance: ", strategy.config.balance)
+
+		argdict = {}
+		if hasattr(strategy, "sum_to_recover"):
+			argdict["sum_to_recover"] = strategy.sum_to_recover
+		if hasattr(strategy, "sum_to_recover_exponitially_decreased"):
+			argdict["sum_to_recover_exponitially_decreased"] = \
+				strategy.sum_to_recover_exponitially_decreased
+		if hasattr(strategy, "steps_on_red"):
+			argdict["steps_on_red"] = strategy.steps_on_red
+
+		stats.update(
+			spent, won,
+			strategy.state().balance,
+			odds_bet_on=[pb.bet_odds.odds_of(pb.selection) for pb in placed_bets],
+			bet_num=len(placed_bets),
+			**argdict,
+		)
+		if timer is not None:
+			timer.lap("stats_update", strategy, start)
+
+		return stats.out_of_money()
 
 	def stats_to_df(self) -> pd.DataFrame():
 		rows = []
 
+		empty = np.zeros(0)
+
 		for (agency_name, strategy_name), stats in self.strategy2statistics.items():
 			stats.compute_stats()
+			other = stats.other
 			rows.append(
 				{
 					"agency": agency_name,
@@ -85,13 +594,17 @@ class Simulation(object):
 					"profit": stats.profit,
 					"profit_per_bet": stats.profit_per_bet,
 					"avg_odd": stats.avg_odd,
-					"spent_sums": np.around(np.array(stats.spent_sums), decimals=2),
-					"balances": np.around(np.array(stats.balances), decimals=2),
-					"results": np.around(np.array(stats.results), decimals=2),
-					"sum_to_recover": np.around(np.array(stats.other['sum_to_recover']), decimals=2),
+					"peak_balance": stats.peak_balance,
+					"max_drawdown": stats.max_drawdown,
+					"longest_losing_streak": stats.longest_losing_streak,
+					"balances_stride": getattr(stats, "stride", 1),
+					"spent_sums": np.around(stats.spent_sums, decimals=2),
+					"balances": np.around(stats.balances, decimals=2),
+					"results": np.around(stats.results, decimals=2),
+					"sum_to_recover": np.around(other.get('sum_to_recover', empty), decimals=2),
 					"sum_to_recover_exponitially_decreased": \
-						np.around(np.array(stats.other['sum_to_recover_exponitially_decreased']), decimals=2),
-					"steps_on_red":  np.around(np.array(stats.other['steps_on_red']), decimals=2),
+						np.around(other.get('sum_to_recover_exponitially_decreased', empty), decimals=2),
+					"steps_on_red":  np.around(other.get('steps_on_red', empty), decimals=2),
 				}
 			)
 
@@ -0,0 +1,85 @@
+"""
+	Stake allocation over the picks of a matchday, all placed from the same bankroll.
+
+	An allocator gets the (fixtures, bets per fixture) odds and win probabilities of the
+	picks of a day with the mask of the placed ones, and the balance at the start of the
+	day, and returns the amount of every pick. The stakes of a day never add up to more
+	than max_exposure of the balance: they are scaled down together when they would.
+"""
+
+import numpy as np
+
+import sys
+sys.path.insert(0, '..')
+
+import settlement
+
+
+def implied_probabilities(odds_matrix: np.ndarray, selections: np.ndarray) -> np.ndarray:
+	"""
+		Chance of every selection code in selections (one row per match) implied by the 1/X/2
+		odds of its match, the bookmaker margin removed.
+	"""
+	implied = 1.0 / odds_matrix[:, :3]
+	implied = implied / implied.sum(axis=1, keepdims=True)
+	won_on = (settlement.SELECTION_MASKS[selections].reshape(*selections.shape, 1) >> np.arange(3)) & 1
+	return np.sum(won_on * implied.reshape(-1, *([1] * (selections.ndim - 1)), 3), axis=-1)
+
+
+def kelly_fractions(probabilities: np.ndarray, odds: np.ndarray) -> np.ndarray:
+	"""Kelly fraction of the bankroll of every bet, 0 for the ones without an edge."""
+	return np.clip((probabilities * odds - 1.0) / np.maximum(odds - 1.0, 1e-12), 0.0, None)
+
+
+class Allocator(object):
+	def __init__(self, max_exposure: float = 1.0):
+		if not 0.0 < max_exposure <= 1.0:
+			raise ValueError(f"max_exposure should be in (0, 1], given: {max_exposure}")
+		self.max_exposure = max_exposure
+
+	def fractions(self, odds: np.ndarray, probabilities: np.ndarray) -> np.ndarray:
+		"""Fraction of the balance to stake on every pick, before the exposure cap."""
+		raise NotImplementedError
+
+	def allocate(
+		self,
+		odds: np.ndarray,
+		probabilities: np.ndarray,
+		placed: np.ndarray,
+		balance: float,
+	) -> np.ndarray:
+		fractions = np.where(placed, self.fractions(odds, probabilities), 0.0)
+		total = fractions.sum()
+		if total > self.max_exposure:
+			fractions = fractions * (self.max_exposure / total)
+		return fractions * max(balance, 0.0)
+
+
+class FractionalAllocator(Allocator):
+	"""The same `fraction` of the balance on every pick."""
+	def __init__(self, fraction: float = 0.01, max_exposure: float = 1.0):
+		super().__init__(max_exposure)
+		self.fraction = fraction
+
+	def __repr__(self):
+		return f"Fractional({self.fraction})"
+
+	def fractions(self, odds: np.ndarray, probabilities: np.ndarray) -> np.ndarray:
+		return np.full(odds.shape, self.fraction)
+
+
+class KellyAllocator(Allocator):
+	"""
+		`fraction` of the Kelly stake of every pick, each pick sized as if it was the only
+		bet (half Kelly by default, the full one is too aggressive for estimated chances).
+		Picks without an edge get nothing.
+	"""
+	def __init__(self, fraction: float = 0.5, max_exposure: float = 0.5):
+		super().__init__(max_exposure)
+		self.fraction = fraction
+
+	def __repr__(self):
+		return f"Kelly({self.fraction})"
+
+	def fractions(self, odds: np.ndarray, probabilities: np.ndarray) -> np.ndarray:
+		return self.fraction * kelly_fractions(probabilities, odds)
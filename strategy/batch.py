@@ -0,0 +1,173 @@
+"""
+	K variants of one strategy class differing in a few parameters, simulated together.
+
+	StrategyBatch(MartingaleStrategy, config, {'preffered_amount': [1.0, 0.1, 0.01]})
+
+	A parameter is a config field (preffered_amount, preffered_profit, balance, ...), a
+	constructor argument (decay) or an attribute the strategy sets in its constructor
+	(FAVORITE_THRESHOLD). Every variant is a regular strategy object, reported under its own
+	name, but Simulation advances the K of them as (K x matches) arrays:
+		* strategy classes with a play_batch classmethod (the Martingales) run their batched
+			kernel, see strategy.kernels.play_martingale_batch
+		* strategies implementing bet_vectorized are settled and summed for all the variants
+			at once, chunk by chunk
+	and otherwise the variants are played one after the other.
+"""
+
+import inspect
+import itertools
+import numpy as np
+
+from copy import deepcopy
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import settlement
+from bet_details import NO_BET_CODE
+from .interface import BettingStrategy
+from .config import BettingStrategyConfig
+from .stats import OUT_OF_MONEY_BALANCE
+
+
+class StrategyBatch(object):
+	def __init__(
+		self,
+		strategy_cls: type,
+		config: BettingStrategyConfig,
+		grid: Dict[str, Sequence],
+		product: bool = True,
+		**kwargs,
+	):
+		"""
+			grid: parameter -> values. With product the variants are all the combinations
+				of the values, otherwise the i-th variant takes the i-th value of every list.
+			kwargs: passed as is to the constructor of every variant (tag, calibration, ...).
+		"""
+		names = list(grid)
+		if product:
+			combinations = list(itertools.product(*[grid[name] for name in names]))
+		else:
+			lengths = {len(grid[name]) for name in names}
+			if len(lengths) > 1:
+				raise ValueError(f"Grid values should have the same length without product, given: {lengths}")
+			combinations = list(zip(*[grid[name] for name in names]))
+
+		self.strategy_cls = strategy_cls
+		self.params = [dict(zip(names, values)) for values in combinations]
+		self.variants = [self._make_variant(config, params, kwargs) for params in self.params]
+		self.names = [
+			str(variant) + "{" + ", ".join(f"{name}={value}" for name, value in params.items()) + "}"
+			for variant, params in zip(self.variants, self.params)
+		]
+
+	def _make_variant(self, config: BettingStrategyConfig, params: Dict, kwargs: Dict) -> BettingStrategy:
+		config = deepcopy(config)
+		constructor_args = dict(kwargs)
+		attributes = {}
+		accepted = inspect.signature(self.strategy_cls.__init__).parameters
+
+		for name, value in params.items():
+			if hasattr(config, name):
+				setattr(config, name, value)
+			elif name in accepted:
+				constructor_args[name] = value
+			else:
+				attributes[name] = value
+
+		variant = self.strategy_cls(config, **constructor_args)
+		for name, value in attributes.items():
+			if not hasattr(variant, name):
+				raise ValueError(f"{self.strategy_cls.__name__} has no parameter {name}")
+			setattr(variant, name, value)
+		return variant
+
+	def __len__(self) -> int:
+		return len(self.variants)
+
+	def subset(self, names: Sequence[str]) -> 'StrategyBatch':
+		"""The batch of the variants called `names`, sharing the variant objects."""
+		names = set(names)
+		kept = [idx for idx, name in enumerate(self.names) if name in names]
+		batch = object.__new__(StrategyBatch)
+		batch.strategy_cls = self.strategy_cls
+		batch.params = [self.params[idx] for idx in kept]
+		batch.variants = [self.variants[idx] for idx in kept]
+		batch.names = [self.names[idx] for idx in kept]
+		return batch
+
+	def __repr__(self):
+		return f"{self.strategy_cls.__name__}x{len(self.variants)}"
+
+	def play_batch(
+		self,
+		odds_matrix: np.ndarray,
+		hit_matrix: np.ndarray,
+		chunk_size: int,
+	) -> Optional[Iterator[List[Optional[Dict[str, np.ndarray]]]]]:
+		"""
+			Per chunk of matches, the StrategyStatistics.update_many arguments of every
+			variant (None once out of money), or None if the variants can't be batched.
+		"""
+		play = getattr(self.strategy_cls, 'play_batch', None)
+		if play is not None:
+			chunks = play(self.variants, odds_matrix, hit_matrix, chunk_size)
+			if chunks is not None:
+				return chunks
+
+		if any(variant.bet_vectorized(odds_matrix[:1]) is None for variant in self.variants):
+			return None
+		return play_vectorized_batch(self.variants, odds_matrix, hit_matrix, chunk_size)
+
+
+def play_vectorized_batch(
+	variants: List[BettingStrategy],
+	odds_matrix: np.ndarray,
+	hit_matrix: np.ndarray,
+	chunk_size: int,
+) -> Iterator[List[Optional[Dict[str, np.ndarray]]]]:
+	"""
+		Simulation.simulate_vectorized for K variants: the bets of all the variants on a
+		chunk of matches are settled in one go and their balances are one (K x matches) cumsum.
+	"""
+	num_variants = len(variants)
+	balance = np.array([float(variant.config.balance) for variant in variants])
+	alive = np.ones(num_variants, dtype=bool)
+
+	for chunk_start in range(0, odds_matrix.shape[0], chunk_size):
+		if not alive.any():
+			break
+		odds = odds_matrix[chunk_start:chunk_start + chunk_size]
+		hits = hit_matrix[chunk_start:chunk_start + chunk_size]
+
+		bets = [variant.bet_vectorized(odds) for variant in variants]
+		num_bets = max(selections.shape[1] for selections, _ in bets)
+		selections = np.full((num_variants, odds.shape[0], num_bets), NO_BET_CODE, dtype=np.int64)
+		amounts = np.zeros((num_variants, odds.shape[0], num_bets))
+		for variant_idx, (variant_selections, variant_amounts) in enumerate(bets):
+			selections[variant_idx, :, :variant_selections.shape[1]] = variant_selections
+			amounts[variant_idx, :, :variant_amounts.shape[1]] = variant_amounts
+
+		placed, selection_odds, spent, won = settlement.settle_picks(odds, hits, selections, amounts)
+
+		# prepend the balance so the sum runs left to right, like the step by step path
+		balances = np.cumsum(np.concatenate((balance.reshape(-1, 1), won - spent), axis=1), axis=1)[:, 1:]
+		out_of_money = (balances <= OUT_OF_MONEY_BALANCE)
+		played = np.where(out_of_money.any(axis=1), out_of_money.argmax(axis=1) + 1, odds.shape[0])
+		played = np.where(alive, played, 0)
+
+		updates = []
+		for variant_idx, (variant, num_played) in enumerate(zip(variants, played.tolist())):
+			if num_played == 0:
+				updates.append(None)
+				continue
+			variant_placed = placed[variant_idx, :num_played]
+			updates.append({
+				'spent': spent[variant_idx, :num_played],
+				'won': won[variant_idx, :num_played],
+				'balances': balances[variant_idx, :num_played],
+				'odds_bet_on': selection_odds[variant_idx, :num_played][variant_placed],
+				'bet_nums': variant_placed.sum(axis=1),
+			})
+			balance[variant_idx] = balances[variant_idx, num_played - 1]
+			variant.config.balance = balance[variant_idx].item()
+		alive &= ~out_of_money.any(axis=1)
+		yield updates
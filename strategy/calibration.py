@@ -0,0 +1,176 @@
+"""
+	Builds the odds to actual probability tables used by BetOnRealChanceIfOddsFake
+	(see stateless.HOME_ODDS_TO_ACTUAL_PROBABILITY for the format) from a match store,
+	instead of pasting constants computed offline.
+
+	For every simple selection (1, X, 2) and odds bucket we count the games whose odds for
+	that selection fall in the bucket, and how many of them the selection won. All of it
+	is one bincount over the store, and the counts can be added to / removed from when
+	the matches they are computed on change (e.g. walk forward windows).
+"""
+
+import os
+import pickle
+import hashlib
+import numpy as np
+
+import sys
+sys.path.insert(0, '..')
+
+from bet_details import *
+from match_store import MatchStore
+
+from typing import *
+
+CALIBRATION_CACHE_DIR = os.path.join(
+	os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'calibration'
+)
+
+MAX_ODD = 100000.0
+CALIBRATED_SELECTIONS = [BetSelection.ONE, BetSelection.X, BetSelection.TWO]
+
+
+def prob_edges_to_odds_edges(prob_edges: Sequence[float]) -> np.ndarray:
+	"""Odds bucket edges, ascending, from probability edges. Probability 0 maps to MAX_ODD."""
+	odds_edges = {MAX_ODD if prob <= 0 else round(1.0 / prob, 2) for prob in prob_edges}
+	return np.array(sorted(odds_edges), dtype=np.float64)
+
+
+# buckets of 5% of implied probability, the ones of the pasted tables
+DEFAULT_ODDS_EDGES = prob_edges_to_odds_edges(np.round(np.arange(0.0, 1.0001, 0.05), 2))
+
+
+class CalibrationCounts(object):
+	"""
+		Games and wins per (group, selection, odds bucket). The group is the league name
+		with by_league, None otherwise. Buckets are [low, high) except the last one which
+		also includes its high edge.
+	"""
+	def __init__(self, odds_edges: Optional[Sequence[float]] = None, by_league: bool = False):
+		odds_edges = DEFAULT_ODDS_EDGES if odds_edges is None else odds_edges
+		self.odds_edges = np.array(sorted(odds_edges), dtype=np.float64)
+		self.by_league = by_league
+		self.games = {}
+		self.wins = {}
+
+	@property
+	def num_buckets(self) -> int:
+		return len(self.odds_edges) - 1
+
+	def add(self, store: MatchStore, sign: int = 1):
+		num_buckets = self.num_buckets
+		played = store.valid() & (store.result >= 0)
+
+		odds = store.odds[played, :len(CALIBRATED_SELECTIONS)]
+		won = (store.result[played].reshape(-1, 1) == np.arange(len(CALIBRATED_SELECTIONS)))
+
+		bucket = np.searchsorted(self.odds_edges, odds, side='right') - 1
+		bucket[odds == self.odds_edges[-1]] = num_buckets - 1
+		in_range = (bucket >= 0) & (bucket < num_buckets)
+
+		if self.by_league:
+			num_groups = len(store.leagues)
+			group = np.broadcast_to(store.league[played].reshape(-1, 1), odds.shape)
+		else:
+			num_groups = 1
+			group = np.zeros(odds.shape, dtype=np.int64)
+		selection = np.broadcast_to(np.arange(len(CALIBRATED_SELECTIONS)), odds.shape)
+
+		key = ((group * len(CALIBRATED_SELECTIONS) + selection) * num_buckets + bucket)[in_range]
+		shape = (num_groups, len(CALIBRATED_SELECTIONS), num_buckets)
+		games = np.bincount(key, minlength=np.prod(shape)).reshape(shape)
+		wins = np.bincount(key, weights=won[in_range], minlength=np.prod(shape)).reshape(shape)
+
+		for group_code in np.flatnonzero(games.sum(axis=(1, 2))):
+			name = store.leagues[group_code] if self.by_league else None
+			if name not in self.games:
+				self.games[name] = np.zeros(shape[1:], dtype=np.int64)
+				self.wins[name] = np.zeros(shape[1:], dtype=np.int64)
+			self.games[name] += sign * games[group_code]
+			self.wins[name] += sign * wins[group_code].astype(np.int64)
+
+	def remove(self, store: MatchStore):
+		self.add(store, sign=-1)
+
+	def group_tables(self, group: Optional[str] = None) -> Dict[str, Dict]:
+		"""selection -> table, in the format of the pasted tables, highest odds first."""
+		games = self.games.get(group, np.zeros((len(CALIBRATED_SELECTIONS), self.num_buckets), dtype=np.int64))
+		wins = self.wins.get(group, np.zeros_like(games))
+
+		tables = {}
+		for selection_idx, selection in enumerate(CALIBRATED_SELECTIONS):
+			table = {}
+			for bucket in reversed(range(self.num_buckets)):
+				num_games = int(games[selection_idx, bucket])
+				if num_games <= 0:
+					continue
+				low, high = float(self.odds_edges[bucket]), float(self.odds_edges[bucket + 1])
+				table[(low, high)] = (
+					round(float(wins[selection_idx, bucket]) / num_games, 2),
+					num_games,
+					[round(1.0 / high, 2), round(1.0 / low, 2)],
+				)
+			tables[selection] = table
+		return tables
+
+	def tables(self) -> Dict:
+		"""
+			group_tables() for all the matches, or league -> group_tables() of the league
+			with by_league (give the strategies the tables of one league).
+		"""
+		if not self.by_league:
+			return self.group_tables()
+		return {group: self.group_tables(group) for group in self.games}
+
+
+def calibration_key(store: MatchStore, odds_edges: Optional[Sequence[float]], by_league: bool) -> str:
+	odds_edges = DEFAULT_ODDS_EDGES if odds_edges is None else odds_edges
+	digest = hashlib.blake2b(digest_size=16)
+	digest.update(store.fingerprint().encode())
+	digest.update(np.asarray(sorted(odds_edges), dtype=np.float64).tobytes())
+	digest.update(str(by_league).encode())
+	return digest.hexdigest()
+
+
+def build_calibration(
+	store: MatchStore,
+	odds_edges: Optional[Sequence[float]] = None,
+	by_league: bool = False,
+	cache_dir: Optional[str] = CALIBRATION_CACHE_DIR,
+) -> Dict:
+	"""
+		Calibration tables of a store (see CalibrationCounts.tables), cached on disk by
+		dataset hash. Pass the matches of one agency for per agency tables.
+		cache_dir=None disables the cache.
+	"""
+	cache_path = None
+	if cache_dir is not None:
+		cache_path = os.path.join(cache_dir, calibration_key(store, odds_edges, by_league) + '.pkl')
+		if os.path.exists(cache_path):
+			with open(cache_path, 'rb') as cache_file:
+				return pickle.load(cache_file)
+
+	counts = CalibrationCounts(odds_edges, by_league)
+	counts.add(store)
+	tables = counts.tables()
+
+	if cache_path is not None:
+		os.makedirs(cache_dir, exist_ok=True)
+		with open(cache_path + '.tmp', 'wb') as cache_file:
+			pickle.dump(tables, cache_file)
+		os.replace(cache_path + '.tmp', cache_path)
+	return tables
+
+
+def main():
+	from betting_agency import Bet365
+
+	agency = Bet365(sys.argv[1])
+	for selection, table in build_calibration(agency.matches()).items():
+		print(selection)
+		for interval, stats in table.items():
+			print("\t", interval, stats)
+
+
+if __name__ == "__main__":
+	main()
@@ -1,9 +1,12 @@
 import sys
 sys.path.insert(0, '..')
 
+import numpy as np
+
 from typing import *
 from bet_details import *
 from .config import BettingStrategyConfig
+from .allocation import implied_probabilities
 
 class BettingStrategy(object):
 
@@ -12,3 +15,50 @@ class BettingStrategy(object):
 
 	def bet(self, bet_odds:BetOdds) -> Tuple[List[PlacedBet], float]:
 		...
+
+	def bet_vectorized(self, odds_matrix: np.ndarray) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+		"""
+			Array version of `bet` over a whole stream of matches, for strategies whose bets
+			only depend on the odds at hand. odds_matrix has a row per match and a column per
+			selection code.
+			Returns (selections, amounts), both of shape (matches, bets per match), with
+			NO_BET_CODE as selection where no bet is placed, or None if the strategy has to
+			be played match by match.
+		"""
+		return None
+
+	def bet_matchday(self, odds_matrix: np.ndarray) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+		"""
+			Bets on all the fixtures of a matchday at once, from the balance at the start of
+			the day (see Simulation.MATCHDAY). Same format as bet_vectorized, which it
+			defaults to; None if the strategy has to be played match by match.
+		"""
+		return self.bet_vectorized(odds_matrix)
+
+	def pick_probabilities(self, odds_matrix: np.ndarray, selections: np.ndarray) -> np.ndarray:
+		"""
+			The chance the strategy gives each of its picks (selections of shape (matches, bets
+			per match)), for sizing the stakes. Defaults to the chance implied by the odds.
+		"""
+		return implied_probabilities(odds_matrix, selections)
+
+	def play_vectorized(self, odds_matrix: np.ndarray, hit_matrix: np.ndarray) -> Optional[Dict[str, np.ndarray]]:
+		"""
+			For strategies whose stakes depend on the running balance: plays the whole stream
+			in a compiled loop (see strategy.kernels), stopping once out of money, and leaves
+			the strategy in the state of the last match played. hit_matrix[i, code] tells
+			whether selection code won match i.
+			Returns the per match spent, won, balances and bet_nums of the matches played,
+			the odds_bet_on and the `other` values the strategy reports, or None if the
+			strategy has to be played match by match.
+		"""
+		return None
+
+
+def single_bets(selections: np.ndarray, amount: float, placed: Optional[np.ndarray] = None):
+	"""(selections, amounts) of strategies placing at most one bet of `amount` per match."""
+	if placed is not None:
+		selections = np.where(placed, selections, NO_BET_CODE)
+	selections = selections.reshape(-1, 1)
+	amounts = np.where(selections != NO_BET_CODE, amount, 0.0)
+	return selections, amounts
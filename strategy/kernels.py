@@ -0,0 +1,308 @@
+"""
+	Compiled loops for the strategies whose stake depends on the running balance, so they
+	can't be written as an array expression (see BettingStrategy.play_vectorized).
+
+	The loops are compiled with numba when it is installed. Otherwise the same function runs
+	as plain python over lists, which is still far cheaper than building BetOdds/PlacedBet
+	objects and settling them one by one. Both do the float operations of the object based
+	path in the same order, so the balances are the same.
+"""
+
+import numpy as np
+
+from typing import Dict, Iterator, List, Optional, Sequence
+
+try:
+	from numba import njit
+	HAVE_NUMBA = True
+except ImportError:
+	HAVE_NUMBA = False
+
+	def njit(*args, **kwargs):
+		if len(args) == 1 and callable(args[0]):
+			return args[0]
+		return lambda function: function
+
+from .stats import OUT_OF_MONEY_BALANCE
+
+
+@njit(cache=True)
+def martingale_kernel(
+	odds, hit, placed,
+	balance, preffered_amount, preffered_profit, decay, use_decay,
+	max_balance, steps_on_red, steps_on_green, last_balance, has_last_balance,
+	sum_to_recover, sum_to_recover_decayed,
+	out_spent, out_won, out_balance, out_bet_balance,
+	out_sum_to_recover, out_sum_to_recover_decayed, out_steps_on_red,
+):
+	"""
+		MartingaleStrategy(ExponentialDecay).bet + StrategyState.update + settlement, match by
+		match, until the balance is out of money. odds/hit are the odds and outcome of the
+		selection the strategy picks on every match, placed whether it bets at all.
+		Fills the out_ arrays for the matches played, out_bet_balance being the balance the
+		stake was decided on, and returns the number of matches played and the final state.
+	"""
+	num_played = 0
+	for idx in range(len(odds)):
+		spent = 0.0
+		won = 0.0
+		if placed[idx]:
+			odd = odds[idx]
+			if max_balance > balance:
+				sum_to_recover = max_balance - balance + preffered_amount
+				amount = sum_to_recover
+				if use_decay:
+					amount *= decay ** (steps_on_red + 1)
+					sum_to_recover_decayed = amount
+				amount = amount / odd
+			else:
+				amount = preffered_profit / (odd - 1)
+
+			# StrategyState.update, with the balance before the match is settled
+			max_balance = max(max_balance, balance)
+			if has_last_balance and last_balance <= balance:
+				steps_on_red = 0
+				steps_on_green += 1
+			else:
+				steps_on_red += 1
+				steps_on_green = 0
+			last_balance = balance
+			has_last_balance = True
+
+			spent = amount
+			won = amount * odd if hit[idx] else 0.0
+			out_bet_balance[idx] = balance
+
+		balance += (won - spent)
+		out_spent[idx] = spent
+		out_won[idx] = won
+		out_balance[idx] = balance
+		out_sum_to_recover[idx] = sum_to_recover
+		out_sum_to_recover_decayed[idx] = sum_to_recover_decayed
+		out_steps_on_red[idx] = steps_on_red
+		num_played = idx + 1
+
+		if balance <= OUT_OF_MONEY_BALANCE:
+			break
+
+	return (
+		num_played, balance, max_balance, steps_on_red, steps_on_green,
+		last_balance, has_last_balance, sum_to_recover, sum_to_recover_decayed,
+	)
+
+
+def play_martingale(
+	strategy,
+	selections: np.ndarray,
+	odds_matrix: np.ndarray,
+	hit_matrix: np.ndarray,
+	decay: Optional[float] = None,
+) -> Dict[str, np.ndarray]:
+	"""
+		play_vectorized of the Martingale strategies, selections being the (matches, 1)
+		picks of BetOnRealChanceIfOddsFake. Updates the strategy state and balance like
+		playing the matches one by one would, except for the placed bets history.
+	"""
+	num_matches = odds_matrix.shape[0]
+	selections = selections[:, 0]
+	placed = (selections >= 0)
+	picked = np.where(placed, selections, 0).reshape(-1, 1)
+	odds = np.take_along_axis(odds_matrix, picked, axis=1)[:, 0]
+	hit = np.take_along_axis(hit_matrix, picked, axis=1)[:, 0]
+
+	outputs = ['spent', 'won', 'balance', 'bet_balance', 'sum_to_recover', 'sum_to_recover_decayed', 'steps_on_red']
+	if HAVE_NUMBA:
+		out = {name: np.zeros(num_matches) for name in outputs}
+		out['steps_on_red'] = np.zeros(num_matches, dtype=np.int64)
+		inputs = (odds, hit, placed)
+	else:
+		out = {name: [0] * num_matches for name in outputs}
+		inputs = (odds.tolist(), hit.tolist(), placed.tolist())
+
+	balances = strategy.balances
+	config = strategy.config
+	(
+		num_played, balance, max_balance, steps_on_red, steps_on_green,
+		_, _, sum_to_recover, sum_to_recover_decayed,
+	) = martingale_kernel(
+		*inputs,
+		float(config.balance), float(config.preffered_amount), float(config.preffered_profit),
+		1.0 if decay is None else float(decay), decay is not None,
+		float(strategy.max_balance), int(strategy.steps_on_red), int(strategy.steps_on_green),
+		float(balances[-1]) if len(balances) else 0.0, len(balances) > 0,
+		float(strategy.sum_to_recover), float(getattr(strategy, 'sum_to_recover_exponitially_decreased', 0.0)),
+		*[out[name] for name in outputs],
+	)
+	out = {name: np.asarray(values)[:num_played] for name, values in out.items()}
+	placed = placed[:num_played]
+
+	config.balance = balance
+	strategy.max_balance = max_balance
+	strategy.steps_on_red = steps_on_red
+	strategy.steps_on_green = steps_on_green
+	strategy.sum_to_recover = sum_to_recover
+	for bet_balance in out['bet_balance'][placed][-strategy.capacity:].tolist():
+		balances.append(bet_balance)
+
+	other = {
+		'sum_to_recover': out['sum_to_recover'],
+		'steps_on_red': out['steps_on_red'].astype(np.float64),
+	}
+	if decay is not None:
+		strategy.sum_to_recover_exponitially_decreased = sum_to_recover_decayed
+		other['sum_to_recover_exponitially_decreased'] = out['sum_to_recover_decayed']
+
+	return {
+		'spent': out['spent'].astype(np.float64),
+		'won': out['won'].astype(np.float64),
+		'balances': out['balance'].astype(np.float64),
+		'odds_bet_on': odds[:num_played][placed],
+		'bet_nums': placed.astype(np.int64),
+		'other': other,
+	}
+
+
+def play_martingale_batch(
+	variants: List,
+	selections: np.ndarray,
+	odds_matrix: np.ndarray,
+	hit_matrix: np.ndarray,
+	chunk_size: int,
+	decays: Optional[Sequence[float]] = None,
+) -> Iterator[List[Optional[Dict[str, np.ndarray]]]]:
+	"""
+		martingale_kernel for K variants of a Martingale strategy sharing their picks, the K
+		states advancing together as arrays, variants out of money being masked out.
+		Yields, for every chunk of chunk_size matches, the StrategyStatistics.update_many
+		arguments of every variant (None for the variants that didn't play the chunk), and
+		updates the variant states like play_martingale does.
+	"""
+	num_variants = len(variants)
+	num_matches = odds_matrix.shape[0]
+	selections = selections[:, 0]
+	placed_all = (selections >= 0)
+	picked = np.where(placed_all, selections, 0).reshape(-1, 1)
+	odds_all = np.take_along_axis(odds_matrix, picked, axis=1)[:, 0]
+	hit_all = np.take_along_axis(hit_matrix, picked, axis=1)[:, 0]
+
+	balance = np.array([float(variant.config.balance) for variant in variants])
+	preffered_amount = np.array([float(variant.config.preffered_amount) for variant in variants])
+	preffered_profit = np.array([float(variant.config.preffered_profit) for variant in variants])
+	decay = None if decays is None else np.asarray(decays, dtype=np.float64)
+
+	max_balance = np.array([float(variant.max_balance) for variant in variants])
+	steps_on_red = np.array([variant.steps_on_red for variant in variants], dtype=np.int64)
+	steps_on_green = np.array([variant.steps_on_green for variant in variants], dtype=np.int64)
+	has_last_balance = np.array([len(variant.balances) > 0 for variant in variants])
+	last_balance = np.array([float(variant.balances[-1]) if len(variant.balances) else 0.0 for variant in variants])
+	sum_to_recover = np.array([float(variant.sum_to_recover) for variant in variants])
+	sum_to_recover_decayed = np.array([
+		float(getattr(variant, 'sum_to_recover_exponitially_decreased', 0.0)) for variant in variants
+	])
+	alive = np.ones(num_variants, dtype=bool)
+	zeros = np.zeros(num_variants)
+
+	for chunk_start in range(0, num_matches, chunk_size):
+		if not alive.any():
+			break
+		odds = odds_all[chunk_start:chunk_start + chunk_size].tolist()
+		hit = hit_all[chunk_start:chunk_start + chunk_size].tolist()
+		placed = placed_all[chunk_start:chunk_start + chunk_size]
+		num_chunk = len(odds)
+
+		# column major, every match writes one contiguous column
+		outputs = [np.zeros((num_variants, num_chunk), order='F') for _ in range(7)]
+		(
+			out_spent, out_won, out_balance, out_bet_balance,
+			out_sum_to_recover, out_sum_to_recover_decayed, out_steps_on_red,
+		) = outputs
+		played = np.zeros(num_variants, dtype=np.int64)
+
+		def idle(start, stop):
+			"""Matches [start, stop) without a bet: the state is repeated, nobody's balance moves."""
+			nonlocal alive, played
+			if stop <= start:
+				return
+			out_balance[:, start:stop] = balance.reshape(-1, 1)
+			out_sum_to_recover[:, start:stop] = sum_to_recover.reshape(-1, 1)
+			out_sum_to_recover_decayed[:, start:stop] = sum_to_recover_decayed.reshape(-1, 1)
+			out_steps_on_red[:, start:stop] = steps_on_red.reshape(-1, 1)
+			# only a variant starting out of money can stop on a match without a bet
+			broke = alive & (balance <= OUT_OF_MONEY_BALANCE)
+			played += np.where(broke, 1, alive * (stop - start))
+			alive = alive & ~broke
+
+		last_idx = 0
+		for idx in np.flatnonzero(placed).tolist():
+			idle(last_idx, idx)
+			last_idx = idx + 1
+			if not alive.any():
+				break
+
+			odd = odds[idx]
+			recovering = alive & (max_balance > balance)
+			np.copyto(sum_to_recover, max_balance - balance + preffered_amount, where=recovering)
+			if decay is None:
+				recovery_amount = sum_to_recover / odd
+			else:
+				decayed = sum_to_recover * decay ** (steps_on_red + 1)
+				np.copyto(sum_to_recover_decayed, decayed, where=recovering)
+				recovery_amount = decayed / odd
+			amount = np.where(recovering, recovery_amount, preffered_profit / (odd - 1))
+			amount = np.where(alive, amount, 0.0)
+
+			# StrategyState.update, with the balance before the match is settled
+			green = has_last_balance & (last_balance <= balance)
+			np.copyto(max_balance, np.maximum(max_balance, balance), where=alive)
+			np.copyto(steps_on_red, np.where(green, 0, steps_on_red + 1), where=alive)
+			np.copyto(steps_on_green, np.where(green, steps_on_green + 1, 0), where=alive)
+			np.copyto(last_balance, balance, where=alive)
+			has_last_balance |= alive
+			out_bet_balance[:, idx] = balance
+
+			won = amount * odd if hit[idx] else zeros
+			balance = balance + (won - amount)
+			out_spent[:, idx] = amount
+			out_won[:, idx] = won
+			out_balance[:, idx] = balance
+			out_sum_to_recover[:, idx] = sum_to_recover
+			out_sum_to_recover_decayed[:, idx] = sum_to_recover_decayed
+			out_steps_on_red[:, idx] = steps_on_red
+
+			played += alive
+			alive &= (balance > OUT_OF_MONEY_BALANCE)
+		else:
+			idle(last_idx, num_chunk)
+
+		chunk_odds = odds_all[chunk_start:chunk_start + num_chunk]
+		updates = []
+		for variant_idx, (variant, num_played) in enumerate(zip(variants, played.tolist())):
+			if num_played == 0:
+				updates.append(None)
+				continue
+			bets = placed[:num_played]
+			for bet_balance in out_bet_balance[variant_idx, :num_played][bets][-variant.capacity:].tolist():
+				variant.balances.append(bet_balance)
+
+			update = {
+				'spent': out_spent[variant_idx, :num_played],
+				'won': out_won[variant_idx, :num_played],
+				'balances': out_balance[variant_idx, :num_played],
+				'odds_bet_on': chunk_odds[:num_played][bets],
+				'bet_nums': bets.astype(np.int64),
+				'sum_to_recover': out_sum_to_recover[variant_idx, :num_played],
+				'steps_on_red': out_steps_on_red[variant_idx, :num_played],
+			}
+			if decay is not None:
+				update['sum_to_recover_exponitially_decreased'] = out_sum_to_recover_decayed[variant_idx, :num_played]
+			updates.append(update)
+		yield updates
+
+	for variant_idx, variant in enumerate(variants):
+		variant.config.balance = balance[variant_idx].item()
+		variant.max_balance = max_balance[variant_idx].item()
+		variant.steps_on_red = int(steps_on_red[variant_idx])
+		variant.steps_on_green = int(steps_on_green[variant_idx])
+		variant.sum_to_recover = sum_to_recover[variant_idx].item()
+		if decay is not None:
+			variant.sum_to_recover_exponitially_decreased = sum_to_recover_decayed[variant_idx].item()
@@ -0,0 +1,86 @@
+"""
+	Binary search lookup over the odds interval tables of the form
+	(low_odd, high_odd): (actual_chance, num_games, [high_odd_to_prob, low_odd_to_prob])
+	see stateless.HOME_ODDS_TO_ACTUAL_PROBABILITY.
+
+	The tables are compiled once into the sorted array of interval edges. Since the intervals
+	are closed, the interval an odd falls in only changes on an edge, so we precompute the
+	answer of the linear scan (first interval of the table containing the odd) on every edge
+	and on every open segment between two consecutive edges. A lookup is then a single
+	binary search, with the exact boundary semantics of the scan.
+"""
+
+import bisect
+import numpy as np
+
+from typing import Dict, List, Optional, Tuple
+
+Interval = Tuple[float, float]
+
+
+def scan_odd_to_interval(odds_dct: Dict, odd: float) -> Optional[Interval]:
+	for interval in odds_dct:
+		if interval[0] <= odd and odd <= interval[1]:
+			return interval
+	return None
+
+
+class OddsBuckets(object):
+	_compiled = {}
+
+	def __init__(self, odds_dct: Dict[Interval, tuple]):
+		self.table = odds_dct
+		self.intervals: List[Interval] = list(odds_dct)
+		interval_idx = {interval: idx for idx, interval in enumerate(self.intervals)}
+
+		def scan(odd: float) -> int:
+			interval = scan_odd_to_interval(odds_dct, odd)
+			return -1 if interval is None else interval_idx[interval]
+
+		edges = sorted({edge for interval in self.intervals for edge in interval})
+		self._edge_list = edges
+		self._on_edge_list = [scan(edge) for edge in edges]
+		self._between_list = [scan((low + high) / 2) for low, high in zip(edges, edges[1:])]
+
+		self.edges = np.array(edges, dtype=np.float64)
+		self.on_edge = np.array(self._on_edge_list, dtype=np.int64)
+		self.between = np.array(self._between_list + [-1], dtype=np.int64)
+
+		self.actual_chance = np.array([odds_dct[interval][0] for interval in self.intervals])
+		self.num_games = np.array([odds_dct[interval][1] for interval in self.intervals])
+
+	@classmethod
+	def of(cls, odds_dct: Dict[Interval, tuple]) -> 'OddsBuckets':
+		"""Compiled buckets of a table, cached per table object."""
+		buckets = cls._compiled.get(id(odds_dct))
+		if buckets is None or buckets.table is not odds_dct:
+			buckets = cls._compiled[id(odds_dct)] = cls(odds_dct)
+		return buckets
+
+	def index(self, odd: float) -> int:
+		"""Index in `intervals` of the interval containing odd, -1 if there is none."""
+		pos = bisect.bisect_left(self._edge_list, odd)
+		if pos < len(self._edge_list) and self._edge_list[pos] == odd:
+			return self._on_edge_list[pos]
+		if pos == 0 or pos == len(self._edge_list):
+			return -1
+		return self._between_list[pos - 1]
+
+	def lookup(self, odd: float) -> Optional[Interval]:
+		idx = self.index(odd)
+		return None if idx < 0 else self.intervals[idx]
+
+	def indices(self, odds: np.ndarray) -> np.ndarray:
+		"""Array version of index()."""
+		if len(self.edges) == 0:
+			return np.full(np.shape(odds), -1, dtype=np.int64)
+		pos = np.searchsorted(self.edges, odds, side='left')
+		last = len(self.edges) - 1
+		on_edge_pos = np.minimum(pos, last)
+		between_pos = np.where(pos > 0, pos - 1, last)
+
+		return np.where(
+			self.edges[on_edge_pos] == odds,
+			self.on_edge[on_edge_pos],
+			self.between[between_pos],
+		)
@@ -15,16 +15,22 @@ from bet_details import *
 from .interface import BettingStrategy
 from .config import *
 from .stateless import *
+from .stats import RingBuffer
+from .kernels import play_martingale, play_martingale_batch
 
 from typing import *
 
 BETS_IN_THE_RED = 5
 
 class StrategyState(object):
-	def __init__(self, config: BettingStrategyConfig, **kwargs):
-		self.capacity = 20
-		self.history = []
-		self.balances = []
+	"""
+		Keeps the last `capacity` placed bets and balances in ring buffers, the max balance and
+		the red/green streaks are running counters over the whole history.
+	"""
+	def __init__(self, config: BettingStrategyConfig, capacity: int = 20, **kwargs):
+		self.capacity = capacity
+		self.history = RingBuffer(capacity)
+		self.balances = RingBuffer(capacity, dtype=np.float64)
 		self.steps_on_red = 0
 		self.steps_on_green = 0
 		self.max_balance = 0
@@ -52,8 +58,8 @@ class StrategyState(object):
 
 
 class MartingaleStrategy(BetOnRealChanceIfOddsFake, StrategyState):
-	def __init__(self, config: BettingStrategyConfig, tag:str = ""):
-		super().__init__(config)
+	def __init__(self, config: BettingStrategyConfig, tag:str = "", calibration: Optional[Dict] = None):
+		super().__init__(config, calibration)
 		StrategyState.__init__(self, config) #needed for some reason
 		self.tag = tag
 		self.amount = self.config.preffered_amount
@@ -63,6 +69,22 @@ class MartingaleStrategy(BetOnRealChanceIfOddsFake, StrategyState):
 	def __repr__(self):
 		return "MartingaleStrategy" + self.tag
 
+	def bet_vectorized(self, odds_matrix: np.ndarray) -> None:
+		# the stake depends on the running balance
+		return None
+
+	def play_vectorized(self, odds_matrix: np.ndarray, hit_matrix: np.ndarray) -> Dict[str, np.ndarray]:
+		selections, _ = BetOnRealChanceIfOddsFake.bet_vectorized(self, odds_matrix)
+		return play_martingale(self, selections, odds_matrix, hit_matrix)
+
+	@classmethod
+	def play_batch(cls, variants: List['MartingaleStrategy'], odds_matrix: np.ndarray, hit_matrix: np.ndarray, chunk_size: int):
+		"""The variants advancing together, see strategy.batch.StrategyBatch."""
+		if any(variant.selection_to_odds_probs != variants[0].selection_to_odds_probs for variant in variants):
+			return None
+		selections, _ = BetOnRealChanceIfOddsFake.bet_vectorized(variants[0], odds_matrix)
+		return play_martingale_batch(variants, selections, odds_matrix, hit_matrix, chunk_size)
+
 	def bet(self, bet_odds:BetOdds) -> Tuple[List[PlacedBet], float]:
 		super_placed_bets = super().bet(bet_odds)[0]
 		if not super_placed_bets:
@@ -91,8 +113,14 @@ class MartingaleStrategy(BetOnRealChanceIfOddsFake, StrategyState):
 		return placed_bets
 
 class MartingaleStrategyExponentialDecay(BetOnRealChanceIfOddsFake, StrategyState):
-	def __init__(self, config: BettingStrategyConfig, decay:float=0.75, tag:str = ""):
-		super().__init__(config)
+	def __init__(
+		self,
+		config: BettingStrategyConfig,
+		decay:float=0.75,
+		tag:str = "",
+		calibration: Optional[Dict] = None,
+	):
+		super().__init__(config, calibration)
 		StrategyState.__init__(self, config) #needed for some reason
 		self.decay = decay
 		self.tag = tag
@@ -103,6 +131,30 @@ class MartingaleStrategyExponentialDecay(BetOnRealChanceIfOddsFake, StrategyStat
 	def __repr__(self):
 		return "MartingaleStrategy" + self.tag
 
+	def bet_vectorized(self, odds_matrix: np.ndarray) -> None:
+		# the stake depends on the running balance
+		return None
+
+	def play_vectorized(self, odds_matrix: np.ndarray, hit_matrix: np.ndarray) -> Dict[str, np.ndarray]:
+		selections, _ = BetOnRealChanceIfOddsFake.bet_vectorized(self, odds_matrix)
+		return play_martingale(self, selections, odds_matrix, hit_matrix, decay=self.decay)
+
+	@classmethod
+	def play_batch(
+		cls,
+		variants: List['MartingaleStrategyExponentialDecay'],
+		odds_matrix: np.ndarray,
+		hit_matrix: np.ndarray,
+		chunk_size: int,
+	):
+		if any(variant.selection_to_odds_probs != variants[0].selection_to_odds_probs for variant in variants):
+			return None
+		selections, _ = BetOnRealChanceIfOddsFake.bet_vectorized(variants[0], odds_matrix)
+		return play_martingale_batch(
+			variants, selections, odds_matrix, hit_matrix, chunk_size,
+			decays=[variant.decay for variant in variants],
+		)
+
 	def bet(self, bet_odds:BetOdds) -> Tuple[List[PlacedBet], float]:
 		super_placed_bets = super().bet(bet_odds)[0]
 		if not super_placed_bets:
@@ -6,12 +6,16 @@ other details than the betting odds of the match at hand.
 """
 
 
+import numpy as np
+
 import sys
 sys.path.insert(0,'..')
 
 from bet_details import *
-from .interface import BettingStrategy
+from .interface import BettingStrategy, single_bets
 from .config import *
+from .odds_buckets import OddsBuckets
+from .allocation import implied_probabilities
 
 from typing import *
 
@@ -36,6 +40,17 @@ class BetAgainstDraw_ProfitOnUnderDog(BettingStrategy):
 			PlacedBet(bet_odds, selection=bet_odds.underdog_team(), amount=self.config.preffered_amount),
 		], (self.config.preffered_amount + amount_on_fav_team)
 
+	def bet_vectorized(self, odds_matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+		favorite_team = favorite_team_codes(odds_matrix)
+		underdog_team = underdog_team_codes(odds_matrix)
+		amount_on_fav_team = self.config.preffered_amount * \
+			odds_of_codes(odds_matrix, underdog_team) / odds_of_codes(odds_matrix, favorite_team)
+
+		return np.stack([favorite_team, underdog_team], axis=1), np.stack([
+			amount_on_fav_team,
+			np.full_like(amount_on_fav_team, self.config.preffered_amount),
+		], axis=1)
+
 
 class BetAgainstDraw_ProfitOnFavorite(BettingStrategy):
 	"""
@@ -58,6 +73,17 @@ class BetAgainstDraw_ProfitOnFavorite(BettingStrategy):
 			PlacedBet(bet_odds, selection=bet_odds.underdog_team(), amount=amount_on_under_dog_team),
 		], (self.config.preffered_amount + amount_on_under_dog_team)
 
+	def bet_vectorized(self, odds_matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+		favorite_team = favorite_team_codes(odds_matrix)
+		underdog_team = underdog_team_codes(odds_matrix)
+		amount_on_under_dog_team = self.config.preffered_amount * \
+			odds_of_codes(odds_matrix, favorite_team) / odds_of_codes(odds_matrix, underdog_team)
+
+		return np.stack([favorite_team, underdog_team], axis=1), np.stack([
+			np.full_like(amount_on_under_dog_team, self.config.preffered_amount),
+			amount_on_under_dog_team,
+		], axis=1)
+
 
 class BetOnFavoriteOdd(BettingStrategy):
 	def __init__(self, config: BettingStrategyConfig):
@@ -71,6 +97,9 @@ class BetOnFavoriteOdd(BettingStrategy):
 			PlacedBet(bet_odds, selection=bet_odds.favorite_odd(), amount=self.config.preffered_amount),
 		], self.config.preffered_amount
 
+	def bet_vectorized(self, odds_matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+		return single_bets(favorite_odd_codes(odds_matrix), self.config.preffered_amount)
+
 
 class BetAlwaysOnHome(BettingStrategy):
 	def __init__(self, config: BettingStrategyConfig):
@@ -84,6 +113,9 @@ class BetAlwaysOnHome(BettingStrategy):
 			PlacedBet(bet_odds, selection=BetSelection.ONE, amount=self.config.preffered_amount),
 		], self.config.preffered_amount
 
+	def bet_vectorized(self, odds_matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+		return single_bets(np.full(odds_matrix.shape[0], ONE_CODE), self.config.preffered_amount)
+
 
 class BetAlwaysOnDraw(BettingStrategy):
 	def __init__(self, config: BettingStrategyConfig):
@@ -97,6 +129,9 @@ class BetAlwaysOnDraw(BettingStrategy):
 			PlacedBet(bet_odds, selection=BetSelection.X, amount=self.config.preffered_amount),
 		], self.config.preffered_amount
 
+	def bet_vectorized(self, odds_matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+		return single_bets(np.full(odds_matrix.shape[0], X_CODE), self.config.preffered_amount)
+
 
 class BetAlwaysOnAway(BettingStrategy):
 	def __init__(self, config: BettingStrategyConfig):
@@ -110,6 +145,9 @@ class BetAlwaysOnAway(BettingStrategy):
 			PlacedBet(bet_odds, selection=BetSelection.TWO, amount=self.config.preffered_amount),
 		], self.config.preffered_amount
 
+	def bet_vectorized(self, odds_matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+		return single_bets(np.full(odds_matrix.shape[0], TWO_CODE), self.config.preffered_amount)
+
 
 class BetOnClearFavorite(BetOnFavoriteOdd):
 	def __init__(self, config: BettingStrategyConfig, **kwargs):
@@ -129,6 +167,19 @@ class BetOnClearFavorite(BetOnFavoriteOdd):
 			], self.config.preffered_amount
 		return [], 0
 
+	def clear_favorite(self, odds_matrix: np.ndarray) -> np.ndarray:
+		"""Mask of the matches with a clear favorite team."""
+		favorite_odds = odds_of_codes(odds_matrix, favorite_team_codes(odds_matrix))
+		underdog_odds = odds_of_codes(odds_matrix, underdog_team_codes(odds_matrix))
+		return favorite_odds * self.FAVORITE_THRESHOLD <= underdog_odds
+
+	def bet_vectorized(self, odds_matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+		return single_bets(
+			favorite_team_codes(odds_matrix),
+			self.config.preffered_amount,
+			placed=self.clear_favorite(odds_matrix),
+		)
+
 class BetAroundOdd50(BettingStrategy):
 	def __init__(self, config: BettingStrategyConfig, **kwargs):
 		self.config = config
@@ -170,6 +221,28 @@ class BetAgainstDraw_ProfitOnClearFavorite(BetOnClearFavorite):
 			], (self.config.preffered_amount + amount_on_other_team)
 		return [], 0
 
+	def bet_vectorized(self, odds_matrix: np.ndarray) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+		# clipping a percent config depends on the balance at the time of the bet
+		if not isinstance(self.config, BetStrategyConfigAbsolut):
+			return None
+
+		favorite_team = favorite_team_codes(odds_matrix)
+		underdog_team = underdog_team_codes(odds_matrix)
+		placed = self.clear_favorite(odds_matrix)
+		amount_on_other_team = self.config.clip(
+			self.config.preffered_amount * \
+			odds_of_codes(odds_matrix, underdog_team) /\
+			odds_of_codes(odds_matrix, favorite_team)
+		)
+
+		return np.stack([
+			np.where(placed, favorite_team, NO_BET_CODE),
+			np.where(placed, underdog_team, NO_BET_CODE),
+		], axis=1), np.stack([
+			np.where(placed, self.config.preffered_amount, 0.0),
+			np.where(placed, amount_on_other_team, 0.0),
+		], axis=1)
+
 
 class BetAgainstDraw_ProfitOnClearUnFavorite(BetOnClearFavorite):
 	def __init__(self, config: BettingStrategyConfig):
@@ -194,6 +267,28 @@ class BetAgainstDraw_ProfitOnClearUnFavorite(BetOnClearFavorite):
 			], (self.config.preffered_amount + amount_on_other_team)
 		return [], 0
 
+	def bet_vectorized(self, odds_matrix: np.ndarray) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+		# clipping a percent config depends on the balance at the time of the bet
+		if not isinstance(self.config, BetStrategyConfigAbsolut):
+			return None
+
+		favorite_team = favorite_team_codes(odds_matrix)
+		underdog_team = underdog_team_codes(odds_matrix)
+		placed = self.clear_favorite(odds_matrix)
+		amount_on_other_team = self.config.clip(
+			self.config.preffered_amount * \
+			odds_of_codes(odds_matrix, favorite_team) /\
+			odds_of_codes(odds_matrix, underdog_team)
+		)
+
+		return np.stack([
+			np.where(placed, favorite_team, NO_BET_CODE),
+			np.where(placed, underdog_team, NO_BET_CODE),
+		], axis=1), np.stack([
+			np.where(placed, self.config.preffered_amount, 0.0),
+			np.where(placed, amount_on_other_team, 0.0),
+		], axis=1)
+
 """
 	Thse statistics are computed on our entire database of matches and odds.
 	There is some weird ass shit going on. Not completly sure how or why, but maybe
@@ -267,20 +362,34 @@ DRAW_ODDS_TO_ACTUAL_PROBABILITY = {
 }
 
 def odd_to_interval(odds_dct:Dict, odd:float) -> Tuple[float, float]:
-	for interval in odds_dct:
-		if interval[0] <= odd and odd <= interval[1]:
-			return interval
-	return None
+	return OddsBuckets.of(odds_dct).lookup(odd)
 
 class BetOnRealChanceIfOddsFake(BettingStrategy):
-	def __init__(self, config: BettingStrategyConfig):
+	def __init__(self, config: BettingStrategyConfig, calibration: Optional[Dict[str, Dict]] = None):
+		"""
+			calibration: selection -> odds to actual probability table, as built by
+				calibration.build_calibration. Tables built with by_league are
+				league -> selection -> table: pass the ones of a single league,
+				tables[league]. Defaults to the tables above.
+		"""
 		self.config = config
 
-		self.selection_to_odds_probs = {
+		if calibration is not None:
+			unknown = [key for key in calibration if key not in SELECTION_2_CODE]
+			if unknown:
+				raise ValueError(
+					f"calibration should map selections to tables, given keys: {unknown}. "
+					f"For tables built by_league pass the ones of a league, tables[league]"
+				)
+		self.selection_to_odds_probs = calibration if calibration is not None else {
 			BetSelection.ONE: HOME_ODDS_TO_ACTUAL_PROBABILITY,
 			BetSelection.TWO: AWAY_ODDS_TO_ACTUAL_PROBABILITY,
 			BetSelection.X:   DRAW_ODDS_TO_ACTUAL_PROBABILITY,
 		}
+		self.selection_to_buckets = {
+			selection: OddsBuckets.of(odds_probs)
+			for selection, odds_probs in self.selection_to_odds_probs.items()
+		}
 
 	def __repr__(self):
 		return "BetOnRealChanceIfOddsFake"
@@ -290,10 +399,8 @@ class BetOnRealChanceIfOddsFake(BettingStrategy):
 		favorite_odd = bet_odds.odds_of(favorite_choice)
 		favorite_prob = 1 / (favorite_odd + 0.001)
 
-		interval = odd_to_interval(
-			self.selection_to_odds_probs[favorite_choice],
-			favorite_odd
-		)
+		buckets = self.selection_to_buckets.get(favorite_choice)
+		interval = None if buckets is None else buckets.lookup(favorite_odd)
 
 		if not interval:
 			return [], 0
@@ -313,6 +420,35 @@ class BetOnRealChanceIfOddsFake(BettingStrategy):
 
 		return [], 0
 
+	def real_chances(self, odds: np.ndarray, selections: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+		"""(actual chance, games it is computed on) of the selection codes at the given odds, 0 if unknown."""
+		real_prob = np.zeros(selections.shape)
+		games_num = np.zeros(selections.shape, dtype=np.int64)
+		for selection, buckets in self.selection_to_buckets.items():
+			chosen = (selections == SELECTION_2_CODE[selection])
+			interval_idx = buckets.indices(odds[chosen])
+			found = (interval_idx >= 0)
+			if not found.any():
+				# also covers the empty tables, whose arrays can't be indexed with -1
+				continue
+			real_prob[chosen] = np.where(found, buckets.actual_chance[interval_idx], 0.0)
+			games_num[chosen] = np.where(found, buckets.num_games[interval_idx], 0)
+		return real_prob, games_num
+
+	def bet_vectorized(self, odds_matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+		favorite_choice = favorite_odd_codes(odds_matrix)
+		favorite_odd = odds_of_codes(odds_matrix, favorite_choice)
+		real_prob, games_num = self.real_chances(favorite_odd, favorite_choice)
+
+		placed = (games_num > 40) & (real_prob >= 0.65) & (favorite_odd >= 2.0)
+		return single_bets(favorite_choice, self.config.preffered_amount, placed=placed)
+
+	def pick_probabilities(self, odds_matrix: np.ndarray, selections: np.ndarray) -> np.ndarray:
+		"""The calibrated chance of the picks, the implied one where the tables have none."""
+		odds = np.take_along_axis(odds_matrix, selections, axis=1)
+		real_prob, games_num = self.real_chances(odds, selections)
+		return np.where(games_num > 40, real_prob, implied_probabilities(odds_matrix, selections))
+
 
 
 def main():
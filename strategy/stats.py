@@ -1,8 +1,109 @@
 import numpy as np
-from collections import defaultdict
+
+from typing import Dict, Optional, Tuple
+
+# a strategy stops playing once its balance is at or below it
+OUT_OF_MONEY_BALANCE = 10.0
+
+
+class GrowableBuffer(object):
+	"""Preallocated numpy buffer, doubling its capacity when an append doesn't fit."""
+	def __init__(self, capacity: int = 0, dtype=np.float64):
+		self.data = np.empty(capacity, dtype=dtype)
+		self.size = 0
+
+	def __len__(self) -> int:
+		return self.size
+
+	def reserve(self, capacity: int):
+		if capacity > self.data.shape[0]:
+			data = np.empty(capacity, dtype=self.data.dtype)
+			data[:self.size] = self.data[:self.size]
+			self.data = data
+
+	def append(self, value):
+		if self.size == self.data.shape[0]:
+			self.reserve(max(16, 2 * self.size))
+		self.data[self.size] = value
+		self.size += 1
+
+	def extend(self, values: np.ndarray):
+		end = self.size + len(values)
+		if end > self.data.shape[0]:
+			self.reserve(max(end, 2 * self.size))
+		self.data[self.size:end] = values
+		self.size = end
+
+	def view(self) -> np.ndarray:
+		return self.data[:self.size]
+
+
+class RingBuffer(object):
+	"""
+		The last `capacity` values appended, oldest first. NumPy backed when given a dtype,
+		a python list otherwise (for objects). buffer[-1] is the newest value.
+	"""
+	def __init__(self, capacity: int, dtype=None):
+		if capacity < 1:
+			raise ValueError(f"Ring buffer capacity should be positive, given: {capacity}")
+		self.capacity = capacity
+		self.data = [None] * capacity if dtype is None else np.zeros(capacity, dtype=dtype)
+		self.size = 0
+		self.next = 0
+
+	def __len__(self) -> int:
+		return self.size
+
+	def append(self, value):
+		self.data[self.next] = value
+		self.next = (self.next + 1) % self.capacity
+		self.size = min(self.size + 1, self.capacity)
+
+	def __getitem__(self, idx: int):
+		if not -self.size <= idx < self.size:
+			raise IndexError(f"Ring buffer index out of range: {idx}")
+		return self.data[(self.next - self.size + idx % self.size) % self.capacity]
+
+	def values(self):
+		"""All the kept values, oldest first (a copy)."""
+		start = self.next - self.size
+		if isinstance(self.data, np.ndarray):
+			return np.roll(self.data, -start)[:self.size] if self.size == self.capacity else self.data[:self.size].copy()
+		return [self.data[(start + idx) % self.capacity] for idx in range(self.size)]
+
+
+def running_drawdown(balances: np.ndarray, peak: float) -> Tuple[float, float]:
+	"""(peak balance, max drawdown from the running peak), continuing from peak."""
+	if len(balances) == 0:
+		return peak, 0.0
+	peaks = np.maximum.accumulate(np.concatenate(([peak], balances)))[1:]
+	return float(peaks[-1]), float(np.max(peaks - balances))
+
+
+def losing_streaks(balances: np.ndarray, last_balance: Optional[float], streak: int) -> Tuple[int, int]:
+	"""
+		(current, longest) number of consecutive matches the balance went down, continuing
+		from last_balance and a current streak of `streak` matches.
+	"""
+	if len(balances) == 0:
+		return streak, streak
+	previous = np.concatenate(([-np.inf if last_balance is None else last_balance], balances[:-1]))
+	losing = balances < previous
+
+	idx = np.arange(len(balances))
+	last_not_losing = np.maximum.accumulate(np.where(losing, -1, idx))
+	streaks = np.where(last_not_losing < 0, idx + 1 + streak, idx - last_not_losing)
+	return int(streaks[-1]), int(max(streak, streaks.max()))
+
 
 class StrategyStatistics(object):
-	def __init__(self):
+	"""
+		Per match trajectories (spent sums, balances, odds bet on and the extra values a
+		strategy reports) are kept in preallocated numpy buffers, reserve() sizes them from
+		the length of the odds stream. See SummaryStatistics for sweeps that don't need the
+		trajectories.
+	"""
+	def __init__(self, capacity: int = 0):
 		self.start_date = ''
 		self.num_bets = 0
 		self.is_out_of_money = False
@@ -10,46 +111,238 @@ class StrategyStatistics(object):
 		self.total_spent = 0
 		self.profit = 0
 		self.profit_per_bet = 0
-		self.spent_sums = []
-		self.balances = []
-		self.odds_bet_on = []
-		self.results = []
-		self.other = defaultdict(lambda: [])
+		self.peak_balance = -np.inf
+		self.max_drawdown = 0.0
+		self.longest_losing_streak = 0
+		self.results = np.zeros(0)
+
+		self._spent_sums = GrowableBuffer(capacity)
+		self._balances = GrowableBuffer(capacity)
+		self._odds_bet_on = GrowableBuffer(capacity)
+		self._other = {}
+
+	@property
+	def spent_sums(self) -> np.ndarray:
+		return self._spent_sums.view()
+
+	@property
+	def balances(self) -> np.ndarray:
+		return self._balances.view()
+
+	@property
+	def odds_bet_on(self) -> np.ndarray:
+		return self._odds_bet_on.view()
+
+	@property
+	def other(self) -> Dict[str, np.ndarray]:
+		return {key: buffer.view() for key, buffer in self._other.items()}
+
+	def reserve(self, num_matches: int):
+		"""Makes room for the trajectories of num_matches more matches."""
+		for buffer in [self._spent_sums, self._balances, self._odds_bet_on, *self._other.values()]:
+			buffer.reserve(len(buffer) + num_matches)
+
+	def _other_buffer(self, key: str) -> GrowableBuffer:
+		if key not in self._other:
+			self._other[key] = GrowableBuffer(self._balances.data.shape[0])
+		return self._other[key]
 
 	def mark_first_date(self, start_date: str):
 		self.start_date = start_date
 
 	def update(self, spent, won, balance, odds_bet_on, bet_num=1, **argdict):
 		self.num_bets += bet_num
-		self.is_out_of_money = (balance <= 10.0)
+		self.is_out_of_money = (balance <= OUT_OF_MONEY_BALANCE)
 
-		self.spent_sums.append(spent)
-		self.balances.append(balance)
 		self.total_won += won
 		self.total_spent += spent
 
-		self.odds_bet_on.extend(odds_bet_on)
+		self._spent_sums.append(spent)
+		self._balances.append(balance)
+		self._odds_bet_on.extend(odds_bet_on)
+
+		for k, v in argdict.items():
+			self._other_buffer(k).append(v)
+
+	def update_many(self, spent, won, balances, odds_bet_on, bet_nums, **argdict):
+		"""update() for a run of consecutive matches, given as arrays with one entry per match."""
+		if len(balances) == 0:
+			return
+
+		self.num_bets += int(np.sum(bet_nums))
+		self.is_out_of_money = bool(balances[-1] <= OUT_OF_MONEY_BALANCE)
+
+		# accumulate left to right, like update() does
+		self.total_won = np.cumsum(np.concatenate(([self.total_won], won)))[-1].item()
+		self.total_spent = np.cumsum(np.concatenate(([self.total_spent], spent)))[-1].item()
+
+		self._spent_sums.extend(spent)
+		self._balances.extend(balances)
+		self._odds_bet_on.extend(odds_bet_on)
 
 		for k, v in argdict.items():
-			self.other[k].append(v)
+			self._other_buffer(k).extend(v)
 
 	def compute_stats(self):
 		self.profit = (self.total_won - self.total_spent)
 		self.profit_per_bet = self.profit / (self.num_bets + 0.001)
 
 		self.avg_odd = np.average(self.odds_bet_on)
+		# +0.1 for every match the balance went up, -0.1 for every one it went down
+		self.results = np.cumsum(np.concatenate(([0], np.sign(np.diff(self.balances)))) * 0.1)
+
+		self.peak_balance, self.max_drawdown = running_drawdown(self.balances, -np.inf)
+		_, self.longest_losing_streak = losing_streaks(self.balances, None, 0)
+
+	def out_of_money(self):
+		return self.is_out_of_money
+
 
-		for idx, balance in enumerate(self.balances):
-			if idx == 0:
+class SummaryStatistics(object):
+	"""
+		Streaming counterpart of StrategyStatistics for huge sweeps: memory doesn't depend
+		on the number of matches. It keeps running aggregates only (totals, peak balance,
+		max drawdown, longest losing streak, mean and variance of the odds bet on with
+		Welford's algorithm) and a balance curve downsampled to at most curve_size points:
+		one balance every `stride` matches, the stride doubling whenever the curve is full.
+	"""
+	def __init__(self, curve_size: int = 1024):
+		self.start_date = ''
+		self.num_bets = 0
+		self.num_matches = 0
+		self.is_out_of_money = False
+		self.total_won = 0
+		self.total_spent = 0
+		self.profit = 0
+		self.profit_per_bet = 0
+
+		self.last_balance = None
+		self.peak_balance = -np.inf
+		self.max_drawdown = 0.0
+		self.losing_streak = 0
+		self.longest_losing_streak = 0
+
+		self.num_odds_bet_on = 0
+		self.avg_odd = np.nan
+		self.odds_m2 = 0.0
+
+		self.curve_size = curve_size
+		self.stride = 1
+		self._curve = GrowableBuffer(curve_size)
+		self.results = np.zeros(0)
+
+	@property
+	def balances(self) -> np.ndarray:
+		"""The downsampled balance curve, one balance every `stride` matches."""
+		return self._curve.view()
+
+	@property
+	def spent_sums(self) -> np.ndarray:
+		return np.zeros(0)
+
+	@property
+	def odds_bet_on(self) -> np.ndarray:
+		return np.zeros(0)
+
+	@property
+	def other(self) -> Dict[str, np.ndarray]:
+		return {}
+
+	@property
+	def odd_std(self) -> float:
+		return np.sqrt(self.odds_m2 / self.num_odds_bet_on) if self.num_odds_bet_on else np.nan
+
+	def reserve(self, num_matches: int):
+		pass
+
+	def mark_first_date(self, start_date: str):
+		self.start_date = start_date
+
+	def _add_odds(self, odds_bet_on: np.ndarray):
+		# Chan et al. merge of the running (count, mean, m2) with the ones of the batch
+		count = len(odds_bet_on)
+		if count == 0:
+			return
+		mean = float(np.mean(odds_bet_on))
+		m2 = float(np.sum((odds_bet_on - mean) ** 2))
+
+		total = self.num_odds_bet_on + count
+		if self.num_odds_bet_on == 0:
+			self.avg_odd, self.odds_m2 = mean, m2
+		else:
+			delta = mean - self.avg_odd
+			self.avg_odd += delta * count / total
+			self.odds_m2 += m2 + delta ** 2 * self.num_odds_bet_on * count / total
+		self.num_odds_bet_on = total
+
+	def _add_to_curve(self, balances: np.ndarray):
+		first = (-self.num_matches) % self.stride
+		self._curve.extend(balances[first::self.stride])
+		self._compact_curve()
+
+	def _compact_curve(self):
+		while len(self._curve) > self.curve_size:
+			kept = self._curve.view()[::2].copy()
+			self._curve.size = 0
+			self._curve.extend(kept)
+			self.stride *= 2
+
+	def update(self, spent, won, balance, odds_bet_on, bet_num=1, **argdict):
+		self.num_bets += bet_num
+		self.is_out_of_money = (balance <= OUT_OF_MONEY_BALANCE)
+
+		self.total_won += won
+		self.total_spent += spent
+
+		for odd in odds_bet_on:
+			self.num_odds_bet_on += 1
+			if self.num_odds_bet_on == 1:
+				self.avg_odd, self.odds_m2 = odd, 0.0
 				continue
-			if balance > self.balances[idx - 1]:
-				self.results.append(1)
-			elif balance < self.balances[idx - 1]:
-				self.results.append(-1)
-			else:
-				self.results.append(0)
-		self.results = np.cumsum(np.array([0] + self.results) * 0.1)
+			delta = odd - self.avg_odd
+			self.avg_odd += delta / self.num_odds_bet_on
+			self.odds_m2 += delta * (odd - self.avg_odd)
+
+		self.peak_balance = max(self.peak_balance, balance)
+		self.max_drawdown = max(self.max_drawdown, self.peak_balance - balance)
+
+		if self.last_balance is not None and balance < self.last_balance:
+			self.losing_streak += 1
+			self.longest_losing_streak = max(self.longest_losing_streak, self.losing_streak)
+		else:
+			self.losing_streak = 0
+		self.last_balance = balance
 
+		if self.num_matches % self.stride == 0:
+			self._curve.append(balance)
+			self._compact_curve()
+		self.num_matches += 1
+
+	def update_many(self, spent, won, balances, odds_bet_on, bet_nums, **argdict):
+		if len(balances) == 0:
+			return
+
+		self.num_bets += int(np.sum(bet_nums))
+		self.is_out_of_money = bool(balances[-1] <= OUT_OF_MONEY_BALANCE)
+
+		self.total_won = np.cumsum(np.concatenate(([self.total_won], won)))[-1].item()
+		self.total_spent = np.cumsum(np.concatenate(([self.total_spent], spent)))[-1].item()
+		self._add_odds(np.asarray(odds_bet_on, dtype=np.float64))
+
+		peak_balance, max_drawdown = running_drawdown(balances, self.peak_balance)
+		self.peak_balance = peak_balance
+		self.max_drawdown = max(self.max_drawdown, max_drawdown)
+
+		self.losing_streak, longest = losing_streaks(balances, self.last_balance, self.losing_streak)
+		self.longest_losing_streak = max(self.longest_losing_streak, longest)
+		self.last_balance = float(balances[-1])
+
+		self._add_to_curve(balances)
+		self.num_matches += len(balances)
+
+	def compute_stats(self):
+		self.profit = (self.total_won - self.total_spent)
+		self.profit_per_bet = self.profit / (self.num_bets + 0.001)
 
 	def out_of_money(self):
 		return self.is_out_of_money
@@ -0,0 +1,138 @@
+"""
+	Seeded synthetic matches, for stress testing the simulation without real data.
+
+	Every match draws its true (home, draw, away) probabilities from a Dirichlet, the result
+	from those probabilities, and the odds are the fair odds shrunk by the bookmaker margin:
+		odd = 1 / (p * (1 + margin))
+	so the implied probabilities of the 1X2 odds add up to 1 + margin. The double chance
+	odds (1X, X2) get the same margin.
+
+	Matches are generated in batches of BATCH_SIZE straight into MatchStore columns. Batch b
+	only depends on (seed, b) and every column of it is drawn from its own stream, so the
+	first n rows of a batch are the same whether it is generated whole or only those n. A
+	store of any size is then the concatenation of the same batches, the last one cut
+	short, and a stream of batches never needs all the matches in memory.
+"""
+
+import numpy as np
+
+from typing import Iterator, Optional, Sequence
+
+from bet_details import SELECTION_CODES, ONE_CODE, X_CODE, TWO_CODE, ONEX_CODE, XTWO_CODE
+from match_store import MatchStore
+
+# mean probabilities of about 0.43 / 0.26 / 0.31, close to the big leagues
+DEFAULT_ALPHA = (4.6, 2.8, 3.3)
+MIN_ODD = 1.01
+# matches per batch, part of what the matches of a seed are
+BATCH_SIZE = 1 << 16
+
+
+class SyntheticMatches(object):
+	def __init__(
+		self,
+		seed: int = 0,
+		margin: float = 0.05,
+		alpha: Sequence[float] = DEFAULT_ALPHA,
+		num_leagues: int = 4,
+		teams_per_league: int = 250,
+		matches_per_day: int = 10,
+		start_date: str = '2000-01-01',
+		round_odds: bool = True,
+	):
+		"""
+			alpha: Dirichlet concentration of the true (home, draw, away) probabilities.
+			margin: bookmaker margin, 0.05 for odds implying 105% in total.
+			round_odds: round the odds down to 2 decimals, like the agencies quote them.
+		"""
+		if teams_per_league < 2:
+			raise ValueError("Need at least 2 teams per league")
+
+		self.seed = seed
+		self.margin = margin
+		self.alpha = np.asarray(alpha, dtype=np.float64)
+		self.matches_per_day = matches_per_day
+		self.start_date = np.datetime64(start_date, 'ns').astype(np.int64)
+		self.round_odds = round_odds
+		self.teams_per_league = teams_per_league
+
+		self.leagues = [f"L{league}" for league in range(num_leagues)]
+		self.teams = [f"T{team}" for team in range(num_leagues * teams_per_league)]
+
+	def odds_of_probabilities(self, probs: np.ndarray) -> np.ndarray:
+		"""(matches, 5) column major odds from (matches, 3) true 1X2 probabilities."""
+		odds = np.empty((probs.shape[0], len(SELECTION_CODES)), dtype=np.float64, order='F')
+		odds[:, ONE_CODE] = probs[:, 0]
+		odds[:, X_CODE] = probs[:, 1]
+		odds[:, TWO_CODE] = probs[:, 2]
+		odds[:, ONEX_CODE] = probs[:, 0] + probs[:, 1]
+		odds[:, XTWO_CODE] = probs[:, 1] + probs[:, 2]
+
+		odds *= (1.0 + self.margin)
+		np.divide(1.0, odds, out=odds)
+		if self.round_odds:
+			np.floor(odds * 100.0, out=odds)
+			odds /= 100.0
+		np.maximum(odds, MIN_ODD, out=odds)
+		return odds
+
+	def batch(self, batch_idx: int, num_rows: int = BATCH_SIZE) -> MatchStore:
+		"""The first num_rows matches of batch batch_idx, from match batch_idx * BATCH_SIZE."""
+		if not 0 <= num_rows <= BATCH_SIZE:
+			raise ValueError(f"num_rows should be in [0, {BATCH_SIZE}], given: {num_rows}")
+
+		probs_rng, result_rng, league_rng, home_rng, away_rng = (
+			np.random.default_rng(child) for child in np.random.SeedSequence([self.seed, batch_idx]).spawn(5)
+		)
+		first = batch_idx * BATCH_SIZE
+
+		probs = probs_rng.dirichlet(self.alpha, size=num_rows)
+		# inverse cdf: the result is the number of cumulative probabilities below u
+		u = result_rng.random(num_rows).reshape(-1, 1)
+		result = (np.cumsum(probs[:, :2], axis=1) <= u).sum(axis=1).astype(np.int8)
+
+		num_leagues = len(self.leagues)
+		league = league_rng.integers(0, num_leagues, size=num_rows, dtype=np.int32)
+		home = home_rng.integers(0, self.teams_per_league, size=num_rows, dtype=np.int32)
+		away = (home + away_rng.integers(1, self.teams_per_league, size=num_rows, dtype=np.int32)) \
+			% self.teams_per_league
+
+		day = (first + np.arange(num_rows, dtype=np.int64)) // self.matches_per_day
+		date = self.start_date + day * np.int64(24 * 3600 * 10**9)
+
+		return MatchStore(
+			odds=self.odds_of_probabilities(probs),
+			result=result,
+			date=date,
+			home_team=league * self.teams_per_league + home,
+			away_team=league * self.teams_per_league + away,
+			league=league,
+			teams=self.teams,
+			leagues=self.leagues,
+		)
+
+	def iter_batches(self, num_matches: int) -> Iterator[MatchStore]:
+		"""The first num_matches matches, a batch at a time, generating only those."""
+		for batch_idx, start in enumerate(range(0, num_matches, BATCH_SIZE)):
+			yield self.batch(batch_idx, min(BATCH_SIZE, num_matches - start))
+
+	def store(self, num_matches: int) -> MatchStore:
+		"""The first num_matches matches as one store, filled batch by batch."""
+		odds = np.empty((num_matches, len(SELECTION_CODES)), dtype=np.float64, order='F')
+		columns = {
+			'result': np.empty(num_matches, dtype=np.int8),
+			'date': np.empty(num_matches, dtype=np.int64),
+			'home_team': np.empty(num_matches, dtype=np.int32),
+			'away_team': np.empty(num_matches, dtype=np.int32),
+			'league': np.empty(num_matches, dtype=np.int32),
+		}
+
+		start = 0
+		for batch in self.iter_batches(num_matches):
+			rows = slice(start, start + len(batch))
+			odds[rows] = batch.odds
+			for column, values in columns.items():
+				values[rows] = getattr(batch, column)
+			start = rows.stop
+
+		return MatchStore(odds=odds, **columns, teams=self.teams, leagues=self.leagues)
@@ -0,0 +1,182 @@
+"""
+	Walk forward backtests: the match history of an agency is split by date into
+	train / test windows, the strategies are built from what the train window teaches
+	(the calibration tables of BetOnRealChanceIfOddsFake) and played on the test window only.
+
+		train_period  test_period
+		[-----------)[----)                 window 0
+		     [-----------)[----)            window 1, `step` later
+		          [-----------)[----)       ...
+
+	With expanding=True every train window starts at the first match instead.
+
+	The calibration counts are carried from one window to the next, adding the matches
+	entering the train window and removing the ones leaving it, so each window only costs
+	the matches that changed. Test windows are independent and played in parallel.
+"""
+
+import numpy as np
+import pandas as pd
+
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Union
+
+from betting_agency import BettingAgency, StoreAgency
+from parallel import fork_map
+from simulation import Simulation
+from strategy.calibration import CalibrationCounts
+from strategy.interface import BettingStrategy
+
+Period = Union[str, pd.Timedelta, pd.DateOffset]
+
+
+class Window(NamedTuple):
+	train_start: pd.Timestamp
+	test_start: pd.Timestamp
+	test_end: pd.Timestamp
+
+
+def to_period(period: Period):
+	return pd.Timedelta(period) if isinstance(period, str) else period
+
+
+def make_windows(
+	first_date: pd.Timestamp,
+	last_date: pd.Timestamp,
+	train_period: Period,
+	test_period: Period,
+	step: Optional[Period] = None,
+	expanding: bool = False,
+) -> List[Window]:
+	"""
+		Windows with a test window starting in [first_date + train_period, last_date].
+		Train windows are [train_start, test_start), test windows [test_start, test_end).
+		step defaults to test_period, so that the test windows tile the history.
+	"""
+	train_period, test_period = to_period(train_period), to_period(test_period)
+	step = test_period if step is None else to_period(step)
+
+	windows = []
+	test_start = first_date + train_period
+	while test_start <= last_date:
+		train_start = first_date if expanding else test_start - train_period
+		windows.append(Window(train_start, test_start, test_start + test_period))
+		test_start = test_start + step
+	return windows
+
+
+class WalkForward(object):
+	def __init__(
+		self,
+		agency: BettingAgency,
+		make_strategies: Callable[[Optional[Dict]], List[BettingStrategy]],
+		train_period: Period = '730D',
+		test_period: Period = '180D',
+		step: Optional[Period] = None,
+		expanding: bool = False,
+		calibrate: bool = True,
+		odds_edges: Optional[Sequence[float]] = None,
+		num_workers: Optional[int] = None,
+		**simulation_args,
+	):
+		"""
+			make_strategies: builds fresh strategies for a window, given the calibration
+				tables of its train window (None with calibrate=False).
+			num_workers: processes to play the windows on, None for one per core.
+			simulation_args: passed to the Simulation of every window (mode, vectorized, ...).
+		"""
+		self.agency = agency
+		self.make_strategies = make_strategies
+		self.calibrate = calibrate
+		self.odds_edges = odds_edges
+		self.num_workers = num_workers
+		self.simulation_args = simulation_args
+
+		store = agency.matches()
+		self.store = store
+		self.date_order = np.argsort(store.date, kind='stable')
+		self.sorted_dates = store.date[self.date_order]
+
+		if len(store):
+			first_date = pd.Timestamp(self.sorted_dates[0])
+			last_date = pd.Timestamp(self.sorted_dates[-1])
+			self.windows = make_windows(first_date, last_date, train_period, test_period, step, expanding)
+		else:
+			self.windows = []
+
+	def _positions(self, start: pd.Timestamp, end: pd.Timestamp) -> slice:
+		"""Positions in date_order of the matches in [start, end)."""
+		low, high = np.searchsorted(self.sorted_dates, [start.value, end.value], side='left')
+		return slice(int(low), int(high))
+
+	def test_rows(self, window: Window) -> np.ndarray:
+		"""Store rows of the test window, in the order the agency plays them."""
+		return np.sort(self.date_order[self._positions(window.test_start, window.test_end)])
+
+	def calibrations(self) -> List[Optional[Dict]]:
+		"""
+			Calibration tables of every train window, sliding a single CalibrationCounts
+			over the history instead of counting every window from scratch.
+		"""
+		if not self.calibrate:
+			return [None] * len(self.windows)
+
+		counts = CalibrationCounts(self.odds_edges)
+		counted = slice(0, 0)
+		tables = []
+		for window in self.windows:
+			train = self._positions(window.train_start, window.test_start)
+			if train.start >= counted.stop:
+				counts = CalibrationCounts(self.odds_edges)
+				counted = slice(train.start, train.start)
+			if counted.start < train.start:
+				counts.remove(self.store[np.sort(self.date_order[counted.start:train.start])])
+			if counted.stop < train.stop:
+				counts.add(self.store[np.sort(self.date_order[counted.stop:train.stop])])
+			counted = train
+			tables.append(counts.tables())
+		return tables
+
+	def run(self) -> pd.DataFrame:
+		"""stats_to_df() of every window, with the window boundaries as extra columns."""
+		calibrations = self.calibrations()
+
+		def run_window(window_idx):
+			window = self.windows[window_idx]
+			simulation = Simulation(
+				agencies=[StoreAgency(self.store[self.test_rows(window)], str(self.agency))],
+				strategies=self.make_strategies(calibrations[window_idx]),
+				num_workers=1,
+				**self.simulation_args,
+			)
+			simulation.progress = False
+			simulation.simulate()
+			return simulation.stats_to_df()
+
+		frames = fork_map(run_window, len(self.windows), self.num_workers)
+		for window_idx, (window, frame) in enumerate(zip(self.windows, frames)):
+			frame.insert(0, "window", window_idx)
+			frame.insert(1, "train_start", window.train_start)
+			frame.insert(2, "test_start", window.test_start)
+			frame.insert(3, "test_end", window.test_end)
+		if not frames:
+			return pd.DataFrame()
+		return pd.concat(frames, ignore_index=True)
+
+
+def summarize_windows(stats: pd.DataFrame) -> pd.DataFrame:
+	"""Per (agency, strategy) aggregates over the windows of WalkForward.run()."""
+	stats = stats.assign(
+		profitable=stats.profit > 0,
+		ruined=stats.is_out_of_money.astype(bool),
+	)
+	return stats.groupby(["agency", "strategy"]).agg(
+		num_windows=("window", "count"),
+		total_profit=("profit", "sum"),
+		mean_profit=("profit", "mean"),
+		std_profit=("profit", "std"),
+		worst_profit=("profit", "min"),
+		profitable_windows=("profitable", "mean"),
+		ruined_windows=("ruined", "sum"),
+		num_bets=("num_bets", "sum"),
+		max_drawdown=("max_drawdown", "max"),
+	).reset_index()